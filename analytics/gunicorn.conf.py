@@ -0,0 +1,41 @@
+"""Multi-worker production profile for the analytics service.
+
+    cd analytics && PYTHONPATH=.. gunicorn service:app
+
+The master imports the app once, snapshots the course catalog into
+SHARED_ARTIFACTS_DIR and then forks uvicorn workers that map those files
+instead of reading the catalog from MongoDB on every request.
+`kill -HUP <master>` takes a new snapshot and replaces the workers. Set
+SHARED_ARTIFACTS_DIR to an empty string to go back to per-request reads.
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault("SHARED_ARTIFACTS_DIR", "/dev/shm/elearning-artifacts")
+
+from common.artifacts import publish, shared_root
+
+SERVICE = "analytics"
+
+bind = os.getenv("BIND", "0.0.0.0:8003")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Imported modules (numpy, sklearn, ...) are shared copy-on-write after the fork
+preload_app = True
+# Snapshotting a large catalog can take longer than the default 30s
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    if shared_root(SERVICE) is None:
+        return
+    from service import build_artifacts
+    publish(SERVICE, build_artifacts)
+
+def on_reload(server):
+    on_starting(server)
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
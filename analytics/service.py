@@ -1,26 +1,156 @@
 from fastapi import FastAPI, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import json
 from dotenv import load_dotenv
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
+from common.artifacts import current_artifacts, load_array, load_ids, save_array, save_ids
+from common.database import mongo_lifespan, get_database, projection, connect_to_mongo, close_mongo_connection
+from common.metrics import instrument, timed
+from common.admission import Limit, admission_control, to_http_exception
 
 # Load environment variables
 load_dotenv()
 
+# Only the course fields analytics actually reads
+class CourseSummary(BaseModel):
+    id: str = Field(alias="_id")
+    title: str
+    topics: List[str] = []
+
+COURSE_SUMMARY = projection(CourseSummary)
+
+class CourseCatalog:
+    """Course titles and topic counts mapped from the artifacts gunicorn.conf.py published."""
+
+    def __init__(self, directory: str):
+        self.positions = load_ids(directory, "catalog")
+        self.titles = load_array(directory, "catalog.titles")
+        self.topic_counts = load_array(directory, "catalog.topic_counts")
+
+    @staticmethod
+    def save(directory: str, courses: List[Dict]):
+        save_ids(directory, "catalog", [course["_id"] for course in courses])
+        save_array(directory, "catalog.titles", np.array([course.get("title", "") for course in courses], dtype=np.str_))
+        save_array(directory, "catalog.topic_counts", np.array([len(course.get("topics", [])) for course in courses], dtype=np.int32))
+
+    def summaries(self) -> List[Dict]:
+        return [
+            {
+                "_id": self.positions.id_at(pos),
+                "title": str(self.titles[pos]),
+                "topic_count": int(self.topic_counts[pos])
+            }
+            for pos in range(len(self.positions))
+        ]
+
+# Set when the service runs under gunicorn.conf.py with shared artifacts
+catalog: Optional[CourseCatalog] = None
+
+async def build_artifacts(directory: str):
+    """Snapshot the course catalog once in the gunicorn master."""
+    await connect_to_mongo("analytics", "phn_platform")
+    try:
+        courses = await get_database().courses.find({}, COURSE_SUMMARY).to_list(length=None)
+    finally:
+        # The master forks workers next, so it must not keep a client open
+        await close_mongo_connection()
+    CourseCatalog.save(directory, courses)
+
+async def course_summaries(db) -> List[Dict]:
+    """`_id`, `title` and `topic_count` of every course, from the shared catalog when attached."""
+    if catalog is not None:
+        return catalog.summaries()
+    courses = await db.courses.find({}, COURSE_SUMMARY).to_list(length=None)
+    return [
+        {"_id": course["_id"], "title": course["title"], "topic_count": len(course["topics"])}
+        for course in courses
+    ]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global catalog
+    async with mongo_lifespan("analytics", "phn_platform")(app):
+        artifacts = current_artifacts("analytics")
+        if artifacts is not None:
+            catalog = CourseCatalog(artifacts)
+        yield
+
 app = FastAPI(
     title="Analytics Service",
     description="AI-powered analytics for student performance tracking and insights",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+# Clustering scans every progress row, so only a couple may run at once
+admission_control(app, {
+    "/api/analytics/student-clusters": Limit(concurrency=2, queue=8, timeout_ms=60000),
+    "/api/analytics/performance-predictions/{student_id}": Limit(concurrency=16, queue=64, timeout_ms=15000),
+    # Streamed, so no default deadline that would cut the NDJSON body short
+    "/api/analytics/students/summary": Limit(concurrency=8, queue=32),
+}, default=Limit(concurrency=64, queue=256, timeout_ms=10000))
+instrument(app)
+
+MAX_SUMMARY_STUDENTS = int(os.getenv("ANALYTICS_MAX_SUMMARY_STUDENTS", "1000"))
+NO_PROGRESS = "No progress data found for this student"
+
+class StudentSummaryRequest(BaseModel):
+    student_ids: Optional[List[str]] = None
+    course_id: Optional[str] = None
+
+def student_progress_pipeline(match: Dict) -> List[Dict]:
+    """Progress rows joined to their course titles, sorted by student.
+
+    Only the course title survives the `$project` after the `$lookup`, and
+    sorting on the indexed `student_id` lets callers group one student at a
+    time as the cursor streams instead of buffering every row.
+    """
+    return [
+        {"$match": match},
+        {"$sort": {"student_id": 1}},
+        {"$lookup": {
+            "from": "courses",
+            "localField": "course_id",
+            "foreignField": "_id",
+            "as": "course"
+        }},
+        {"$project": {
+            "_id": 0,
+            "student_id": 1,
+            "course_id": 1,
+            "overall_progress": 1,
+            "quiz_scores": 1,
+            "completed_modules": {"$size": {"$ifNull": ["$completed_modules", []]}},
+            "title": {"$arrayElemAt": ["$course.title", 0]},
+            "has_course": {"$gt": [{"$size": "$course"}, 0]}
+        }}
+    ]
 
-# MongoDB connection
-MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGODB_URL)
-db = client.phn_platform
+def summarize_student(rows: List[Dict]) -> Dict:
+    # Rows whose course no longer exists still count towards overall progress
+    return {
+        "overall_progress": float(np.mean([row["overall_progress"] for row in rows])),
+        "courses": [
+            {
+                "course_id": row["course_id"],
+                "title": row["title"],
+                "progress": row["overall_progress"],
+                "completed_modules": row["completed_modules"],
+                "quiz_scores": row["quiz_scores"],
+                "average_quiz_score": float(np.mean([q["score"] for q in row["quiz_scores"]])) if row["quiz_scores"] else 0
+            }
+            for row in rows if row["has_course"]
+        ]
+    }
+
+def ndjson_line(summary: Dict) -> bytes:
+    return (json.dumps(summary, default=str) + "\n").encode()
 
 @app.get("/health")
 async def health_check():
@@ -29,46 +159,86 @@ async def health_check():
 @app.get("/api/analytics/student/{student_id}")
 async def get_student_analytics(student_id: str):
     try:
-        # Get student's progress across all courses
-        progress = await db.student_progress.find(
-            {"student_id": student_id}
+        db = get_database()
+        # Get student's progress across all courses, with course titles
+        rows = await db.student_progress.aggregate(
+            student_progress_pipeline({"student_id": student_id})
         ).to_list(length=None)
         
-        if not progress:
+        if not rows:
             return {
-                "message": "No progress data found for this student",
+                "message": NO_PROGRESS,
                 "overall_progress": 0,
                 "courses": []
             }
         
-        # Calculate overall progress
-        overall_progress = np.mean([p["overall_progress"] for p in progress])
-        
-        # Get detailed course analytics
-        courses = []
-        for p in progress:
-            course = await db.courses.find_one({"_id": p["course_id"]})
-            if course:
-                courses.append({
-                    "course_id": course["_id"],
-                    "title": course["title"],
-                    "progress": p["overall_progress"],
-                    "completed_modules": len(p["completed_modules"]),
-                    "quiz_scores": p["quiz_scores"],
-                    "average_quiz_score": np.mean([q["score"] for q in p["quiz_scores"]]) if p["quiz_scores"] else 0
-                })
-        
-        return {
-            "overall_progress": float(overall_progress),
-            "courses": courses
-        }
+        return summarize_student(rows)
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise to_http_exception(e)
+
+@app.post("/api/analytics/students/summary")
+async def get_student_summaries(request: StudentSummaryRequest):
+    """Summaries for many students, streamed as NDJSON, one line per student.
+
+    Pass `student_ids`, or a `course_id` to summarize everyone enrolled in
+    that course. Each line has the same shape as
+    `/api/analytics/student/{student_id}` plus `student_id`; requested
+    students without progress come last.
+    """
+    if (request.student_ids is None) == (request.course_id is None):
+        raise HTTPException(status_code=400, detail="Provide either student_ids or course_id")
+    try:
+        db = get_database()
+        if request.course_id is not None:
+            student_ids = await db.student_progress.distinct("student_id", {"course_id": request.course_id})
+        else:
+            student_ids = list(dict.fromkeys(request.student_ids))
+        if len(student_ids) > MAX_SUMMARY_STUDENTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {MAX_SUMMARY_STUDENTS} students per request"
+            )
+
+        cursor = db.student_progress.aggregate(
+            student_progress_pipeline({"student_id": {"$in": student_ids}}),
+            batchSize=1000
+        )
+        # Fetch the first batch here so query errors still map to a status code
+        try:
+            first = await cursor.next()
+        except StopAsyncIteration:
+            first = None
+    except Exception as e:
+        raise to_http_exception(e)
+
+    async def lines():
+        seen = set()
+        rows = [first] if first else []
+        async for row in cursor:
+            if row["student_id"] != rows[0]["student_id"]:
+                seen.add(rows[0]["student_id"])
+                yield ndjson_line({"student_id": rows[0]["student_id"], **summarize_student(rows)})
+                rows = []
+            rows.append(row)
+        if rows:
+            seen.add(rows[0]["student_id"])
+            yield ndjson_line({"student_id": rows[0]["student_id"], **summarize_student(rows)})
+        for student_id in student_ids:
+            if student_id not in seen:
+                yield ndjson_line({
+                    "student_id": student_id,
+                    "message": NO_PROGRESS,
+                    "overall_progress": 0,
+                    "courses": []
+                })
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @app.get("/api/analytics/course/{course_id}")
 async def get_course_analytics(course_id: str):
     try:
+        db = get_database()
         # Get all student progress for this course
         progress = await db.student_progress.find(
             {"course_id": course_id}
@@ -88,7 +258,7 @@ async def get_course_analytics(course_id: str):
         completion_rate = len([p for p in progress if p["overall_progress"] >= 0.8]) / total_students
         
         # Get course details
-        course = await db.courses.find_one({"_id": course_id})
+        course = await db.courses.find_one({"_id": course_id}, COURSE_SUMMARY)
         
         return {
             "course_id": course_id,
@@ -106,11 +276,12 @@ async def get_course_analytics(course_id: str):
         }
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise to_http_exception(e)
 
 @app.get("/api/analytics/student-clusters")
 async def get_student_clusters(n_clusters: int = 3):
     try:
+        db = get_database()
         # Get all student progress
         progress = await db.student_progress.find().to_list(length=None)
         
@@ -133,12 +304,13 @@ async def get_student_clusters(n_clusters: int = 3):
             student_ids.append(p["student_id"])
         
         # Normalize features
-        scaler = StandardScaler()
-        features_normalized = scaler.fit_transform(features)
-        
-        # Perform clustering
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = kmeans.fit_predict(features_normalized)
+        with timed("kmeans_fit"):
+            scaler = StandardScaler()
+            features_normalized = scaler.fit_transform(features)
+            
+            # Perform clustering
+            kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+            clusters = kmeans.fit_predict(features_normalized)
         
         # Analyze clusters
         cluster_analysis = []
@@ -160,11 +332,12 @@ async def get_student_clusters(n_clusters: int = 3):
         }
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise to_http_exception(e)
 
 @app.get("/api/analytics/performance-predictions/{student_id}")
 async def get_performance_predictions(student_id: str):
     try:
+        db = get_database()
         # Get student's historical progress
         progress = await db.student_progress.find(
             {"student_id": student_id}
@@ -176,27 +349,30 @@ async def get_performance_predictions(student_id: str):
                 "predictions": []
             }
         
+        courses = await course_summaries(db)
+        courses_by_id = {course["_id"]: course for course in courses}
+        
         # Calculate historical performance metrics
         historical_data = []
         for p in progress:
-            course = await db.courses.find_one({"_id": p["course_id"]})
+            course = courses_by_id.get(p["course_id"])
             if course:
                 historical_data.append({
-                    "course_difficulty": len(course["topics"]),  # Simple difficulty metric
+                    "course_difficulty": course["topic_count"],  # Simple difficulty metric
                     "completion_rate": p["overall_progress"],
                     "quiz_scores": [q["score"] for q in p["quiz_scores"]]
                 })
         
         # Simple prediction model (can be replaced with more sophisticated ML models)
         predictions = []
-        for course in await db.courses.find().to_list(length=None):
+        for course in courses:
             if course["_id"] not in [p["course_id"] for p in progress]:
                 # Calculate predicted performance based on historical data
                 avg_completion = np.mean([d["completion_rate"] for d in historical_data])
                 avg_quiz_score = np.mean([np.mean(d["quiz_scores"]) for d in historical_data])
                 
                 # Adjust prediction based on course difficulty
-                difficulty_factor = len(course["topics"]) / np.mean([d["course_difficulty"] for d in historical_data])
+                difficulty_factor = course["topic_count"] / np.mean([d["course_difficulty"] for d in historical_data])
                 
                 predicted_completion = avg_completion * (1 / difficulty_factor)
                 predicted_quiz_score = avg_quiz_score * (1 / difficulty_factor)
@@ -213,7 +389,7 @@ async def get_performance_predictions(student_id: str):
         }
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise to_http_exception(e)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,25 +1,51 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, UploadFile, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from schemas.auth import TokenSchema, LoginSchema
 from jose import JWTError, jwt
-from typing import Annotated, List
+from typing import Annotated, Literal, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from contextlib import asynccontextmanager
 from datetime import timedelta
+import hashlib
+import orjson
 from fastapi.middleware.cors import CORSMiddleware
-from utils.database import connect_to_mongo, close_mongo_connection, get_collection
+from common.database import mongo_lifespan, get_collection, projection
+from common.metrics import instrument
+from common.admission import Limit, admission_control
 from utils.auth import get_password_hash, verify_password, create_access_token, SECRET_KEY, ALGORITHM
-from models.user import User, UserCreate
+from utils.provisioning import ImportReport, get_hash_pool, import_users, parse_rows, shutdown_hash_pool
+from models.user import User, UserCreate, UserPage, UserPublic
 
-app = FastAPI(title="Auth Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Owned by the app so bulk imports never create it mid-request
+    get_hash_pool()
+    try:
+        async with mongo_lifespan("auth", "elearning_db")(app):
+            yield
+    finally:
+        shutdown_hash_pool()
+
+app = FastAPI(
+    title="Auth Service",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-# Add startup and shutdown events
-@app.on_event("startup")
-async def startup_db_client():
-    await connect_to_mongo()
+# bcrypt makes login/register CPU bound; bulk imports saturate the hash pool
+admission_control(app, {
+    "/login": Limit(concurrency=16, queue=128, timeout_ms=5000),
+    "/register": Limit(concurrency=16, queue=128, timeout_ms=5000),
+    "/users/bulk": Limit(concurrency=1, queue=0),
+    # No default deadline: an NDJSON export streams for as long as it needs
+    "/instructors": Limit(concurrency=16, queue=64),
+}, default=Limit(concurrency=128, queue=512, timeout_ms=5000))
+instrument(app)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    await close_mongo_connection()
+USER_PUBLIC = projection(UserPublic)
 
 app.add_middleware(
     CORSMiddleware,
@@ -77,7 +103,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+async def get_token_claims(token: Annotated[str, Depends(oauth2_scheme)]) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -90,11 +116,17 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-        
+    return payload
+
+async def get_current_user(claims: Annotated[dict, Depends(get_token_claims)]):
     users_collection = get_collection("users")
-    user = await users_collection.find_one({"email": email})
+    user = await users_collection.find_one({"email": claims["sub"]})
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 @app.get("/users/me")
@@ -123,9 +155,33 @@ async def create_instructor(
     await users_collection.insert_one(instructor.dict())
     return {"message": "Instructor created successfully"}
 
-@app.get("/instructors", response_model=List[dict])
+# Admin only bulk provisioning from a CSV or NDJSON upload
+@app.post("/users/bulk", response_model=ImportReport)
+async def bulk_import_users(
+    file: UploadFile,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    format: Literal["csv", "ndjson"] = "csv",
+    role: Optional[Literal["student", "instructor", "admin"]] = None,
+):
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin can import users"
+        )
+    
+    content = await file.read()
+    try:
+        rows = parse_rows(content, format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return await import_users(get_collection("users"), rows, role=role)
+
+@app.get("/instructors", response_model=UserPage)
 async def list_instructors(
-    current_user: Annotated[dict, Depends(get_current_user)]
+    current_user: Annotated[dict, Depends(get_current_user)],
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
 ):
     if current_user.get("role") not in ["admin"]:
         raise HTTPException(
@@ -133,9 +189,29 @@ async def list_instructors(
             detail="Not authorized"
         )
     
+    # Keyset pagination: resume strictly after the last _id the client saw
+    query = {"role": "instructor"}
+    if after:
+        try:
+            query["_id"] = {"$gt": ObjectId(after)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     users_collection = get_collection("users")
-    instructors = await users_collection.find({"role": "instructor"}).to_list(None)
-    return instructors
+    cursor = users_collection.find(query, USER_PUBLIC).sort("_id", 1)
+    
+    # NDJSON export walks every remaining instructor, one batch in memory at a time
+    if format == "ndjson":
+        async def export():
+            async for doc in cursor.batch_size(limit):
+                yield UserPublic.model_validate(doc).model_dump_json() + "\n"
+        return StreamingResponse(export(), media_type="application/x-ndjson")
+    
+    # Fetch one extra document to know whether another page exists
+    docs = await cursor.limit(limit + 1).to_list(length=limit + 1)
+    items = [UserPublic.model_validate(doc) for doc in docs[:limit]]
+    next_cursor = items[-1].id if len(docs) > limit else None
+    return UserPage(items=items, next_cursor=next_cursor)
 
 @app.delete("/instructors/{instructor_id}")
 async def remove_instructor(
@@ -148,30 +224,71 @@ async def remove_instructor(
             detail="Only admin can remove instructors"
         )
     
+    try:
+        query = {"_id": ObjectId(instructor_id), "role": "instructor"}
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid instructor id")
+    
     users_collection = get_collection("users")
-    result = await users_collection.delete_one({"_id": instructor_id, "role": "instructor"})
+    result = await users_collection.delete_one(query)
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Instructor not found")
     
     return {"message": "Instructor removed successfully"}
 
+# Dashboards only depend on the role, so serialize each one once at import
+DASHBOARDS = {
+    "admin": {
+        "dashboard": "admin",
+        "features": ["manage_instructors", "view_statistics", "system_settings"]
+    },
+    "instructor": {
+        "dashboard": "instructor",
+        "features": ["manage_courses", "view_students", "create_content"]
+    },
+    "student": {
+        "dashboard": "student",
+        "features": ["view_courses", "progress", "assignments"]
+    },
+}
+DASHBOARD_BODIES = {role: orjson.dumps(payload) for role, payload in DASHBOARDS.items()}
+DASHBOARD_ETAGS = {
+    role: '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+    for role, body in DASHBOARD_BODIES.items()
+}
+DASHBOARD_CACHE_CONTROL = "private, max-age=300"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an `If-None-Match` list against `etag`."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
 # Get dashboard based on role
 @app.get("/dashboard")
-async def get_dashboard(current_user: Annotated[dict, Depends(get_current_user)]):
-    role = current_user.get("role", "student")
-    if role == "admin":
-        return {
-            "dashboard": "admin",
-            "features": ["manage_instructors", "view_statistics", "system_settings"]
-        }
-    elif role == "instructor":
-        return {
-            "dashboard": "instructor",
-            "features": ["manage_courses", "view_students", "create_content"]
-        }
-    else:
-        return {
-            "dashboard": "student",
-            "features": ["view_courses", "progress", "assignments"]
-        }
\ No newline at end of file
+async def get_dashboard(request: Request, claims: Annotated[dict, Depends(get_token_claims)]):
+    # The role claim is trusted without a lookup, so a deleted or demoted
+    # user keeps the dashboard of their role until the token expires
+    role = claims.get("role")
+    if role is None:
+        # Tokens issued before the role claim existed still need a lookup
+        user = await get_current_user(claims)
+        role = user.get("role", "student")
+    if role not in DASHBOARD_BODIES:
+        role = "student"
+    
+    headers = {
+        "ETag": DASHBOARD_ETAGS[role],
+        "Cache-Control": DASHBOARD_CACHE_CONTROL,
+        "Vary": "Authorization",
+    }
+    if etag_matches(request.headers.get("if-none-match"), DASHBOARD_ETAGS[role]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=DASHBOARD_BODIES[role], media_type="application/json", headers=headers)
\ No newline at end of file
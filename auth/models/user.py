@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, Literal
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Any, List, Optional, Literal
 from datetime import datetime
 
 class UserCreate(BaseModel):
@@ -18,4 +18,24 @@ class User(BaseModel):
     is_active: bool = True
     is_verified: bool = False
     created_at: datetime = datetime.now()
-    updated_at: datetime = datetime.now()
\ No newline at end of file
+    updated_at: datetime = datetime.now()
+
+# User fields that are safe to return from the API (no password hash)
+class UserPublic(BaseModel):
+    id: str = Field(validation_alias="_id")
+    email: str
+    username: str
+    full_name: Optional[str] = None
+    role: Literal["student", "instructor", "admin"] = "student"
+    is_active: bool = True
+    is_verified: bool = False
+    created_at: Optional[datetime] = None
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def stringify_id(cls, value: Any) -> str:
+        return str(value)
+
+class UserPage(BaseModel):
+    items: List[UserPublic]
+    next_cursor: Optional[str] = None
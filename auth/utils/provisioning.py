@@ -0,0 +1,207 @@
+from concurrent.futures import ProcessPoolExecutor
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+from typing import Any, Dict, Iterator, List, Literal, Optional
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+
+from utils.auth import get_password_hash
+from models.user import User, UserCreate
+
+CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "1000"))
+HASH_WORKERS = int(os.getenv("BULK_IMPORT_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+class RowResult(BaseModel):
+    row: int
+    email: Optional[str] = None
+    status: Literal["created", "error"]
+    detail: Optional[str] = None
+
+class ImportReport(BaseModel):
+    created: int
+    failed: int
+    rows: List[RowResult]
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """The bcrypt worker pool; the auth lifespan creates it and shuts it down.
+
+    Workers are spawned rather than forked, so they never inherit the
+    server's threads or open Mongo connections.
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown()
+        _hash_pool = None
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    return [get_password_hash(password) for password in passwords]
+
+def parse_rows(content: bytes, fmt: Literal["csv", "ndjson"]) -> Iterator[Dict[str, Any]]:
+    """Decode the upload up front so an invalid encoding fails before any insert."""
+    try:
+        text = io.StringIO(content.decode("utf-8-sig"))
+    except UnicodeDecodeError:
+        raise ValueError("File must be UTF-8 encoded")
+    return _csv_rows(text) if fmt == "csv" else _ndjson_rows(text)
+
+def _csv_rows(text: io.StringIO) -> Iterator[Dict[str, Any]]:
+    for row in csv.DictReader(text):
+        # Empty CSV cells mean "not provided" so model defaults apply
+        yield {key: value for key, value in row.items() if value not in (None, "")}
+
+def _ndjson_rows(text: io.StringIO) -> Iterator[Dict[str, Any]]:
+    for line in text:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield None
+
+
+async def import_users(
+    users_collection,
+    rows: Iterator[Dict[str, Any]],
+    role: Optional[str] = None,
+) -> ImportReport:
+    """Validate, hash and insert `rows`, returning one result per input row.
+
+    `role`, when given, overrides the role of every row (instructor provisioning).
+    """
+    results: List[RowResult] = []
+    chunk: List[tuple] = []
+    seen_emails = set()
+
+    async def flush():
+        if chunk:
+            results.extend(await _insert_chunk(users_collection, chunk))
+            chunk.clear()
+
+    for index, raw in enumerate(rows, start=1):
+        if not isinstance(raw, dict):
+            results.append(RowResult(row=index, status="error", detail="Malformed row"))
+            continue
+        try:
+            if role is not None:
+                raw = {**raw, "role": role}
+            user = UserCreate.model_validate(raw)
+        except (ValidationError, ValueError) as e:
+            # NDJSON rows can carry any JSON type, and the report only takes strings
+            email = raw.get("email")
+            results.append(RowResult(
+                row=index,
+                email=email if isinstance(email, str) else None,
+                status="error",
+                detail=str(e),
+            ))
+            continue
+        if user.email in seen_emails:
+            results.append(RowResult(row=index, email=user.email, status="error", detail="Duplicate email in file"))
+            continue
+        seen_emails.add(user.email)
+        chunk.append((index, user))
+        if len(chunk) >= CHUNK_SIZE:
+            await flush()
+    await flush()
+
+    results.sort(key=lambda result: result.row)
+    created = sum(1 for result in results if result.status == "created")
+    return ImportReport(created=created, failed=len(results) - created, rows=results)
+
+
+async def _insert_chunk(users_collection, chunk: List[tuple]) -> List[RowResult]:
+    results: List[RowResult] = []
+
+    # One lookup per chunk instead of one per user
+    emails = [user.email for _, user in chunk]
+    existing = {
+        doc["email"]
+        async for doc in users_collection.find({"email": {"$in": emails}}, {"email": 1, "_id": 0})
+    }
+    pending = []
+    for index, user in chunk:
+        if user.email in existing:
+            results.append(RowResult(row=index, email=user.email, status="error", detail="Email already registered"))
+        else:
+            pending.append((index, user))
+    if not pending:
+        return results
+
+    # bcrypt is CPU bound, so spread the chunk across the process pool
+    loop = asyncio.get_running_loop()
+    pool = get_hash_pool()
+    step = max(1, len(pending) // HASH_WORKERS)
+    slices = [pending[i:i + step] for i in range(0, len(pending), step)]
+    hashed = await asyncio.gather(*[
+        loop.run_in_executor(pool, hash_passwords, [user.password for _, user in part])
+        for part in slices
+    ])
+
+    documents = []
+    for part, hashes in zip(slices, hashed):
+        for (_, user), hashed_password in zip(part, hashes):
+            documents.append(User(
+                email=user.email,
+                username=user.username,
+                hashed_password=hashed_password,
+                full_name=user.full_name,
+                role=user.role
+            ).model_dump())
+
+    failed: Dict[int, str] = {}
+    try:
+        await users_collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed[error["index"]] = "Email already registered" if error.get("code") == 11000 else error.get("errmsg", "Write failed")
+
+    for position, (index, user) in enumerate(pending):
+        if position in failed:
+            results.append(RowResult(row=index, email=user.email, status="error", detail=failed[position]))
+        else:
+            results.append(RowResult(row=index, email=user.email, status="created"))
+    return results
+
+
+async def _main(path: str, fmt: str, role: Optional[str]):
+    from common.database import connect_to_mongo, close_mongo_connection, get_collection
+
+    await connect_to_mongo("auth", "elearning_db")
+    try:
+        with open(path, "rb") as f:
+            report = await import_users(get_collection("users"), parse_rows(f.read(), fmt), role=role)
+    finally:
+        await close_mongo_connection()
+        shutdown_hash_pool()
+    for result in report.rows:
+        if result.status == "error":
+            print(f"row {result.row} ({result.email}): {result.detail}")
+    print(f"Created {report.created} users, {report.failed} failed")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk import users from CSV or NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None)
+    parser.add_argument("--role", choices=["student", "instructor", "admin"], default=None)
+    args = parser.parse_args()
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    asyncio.run(_main(args.path, fmt, args.role))
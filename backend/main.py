@@ -1,8 +1,40 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth
+from contextlib import asynccontextmanager
+from common.database import connect_to_mongo, close_mongo_connection
+from common.metrics import instrument
+from common.admission import Limit, admission_control
+from repositories.users import MongoUserRepository, get_user_repository
+from routers import auth, gateway
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    users = get_user_repository()
+    uses_mongo = isinstance(users, MongoUserRepository)
+    if uses_mongo:
+        await connect_to_mongo("backend", "phn_platform")
+    await gateway.open_http_client()
+    try:
+        await users.setup()
+        yield
+    finally:
+        await gateway.close_http_client()
+        if uses_mongo:
+            await close_mongo_connection()
+
+app = FastAPI(lifespan=lifespan)
+# Proxied routes carry no deadline of their own: the upstream services apply
+# theirs, and a client deadline is forwarded as is
+PROXY_LIMIT = Limit(concurrency=256, queue=1024)
+admission_control(app, {
+    "/api/student-home": Limit(concurrency=64, queue=256, timeout_ms=15000),
+    "/api/recommendations/{path:path}": PROXY_LIMIT,
+    "/api/similar-courses/{path:path}": PROXY_LIMIT,
+    "/api/chat": PROXY_LIMIT,
+    "/api/chat/{path:path}": PROXY_LIMIT,
+    "/api/analytics/{path:path}": PROXY_LIMIT,
+}, default=Limit(concurrency=256, queue=1024, timeout_ms=30000))
+instrument(app)
 
 # Configure CORS
 app.add_middleware(
@@ -15,6 +47,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
+app.include_router(gateway.router, tags=["Gateway"])
 
 @app.get("/")
 async def root():
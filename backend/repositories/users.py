@@ -0,0 +1,94 @@
+from abc import ABC, abstractmethod
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from typing import Dict, Optional
+import os
+import uuid
+
+from common.database import get_collection
+
+USER_REPOSITORY = os.getenv("USER_REPOSITORY", "mongo")
+
+
+class UserAlreadyExists(Exception):
+    pass
+
+
+class UserRepository(ABC):
+    """Storage for backend users, keyed by email.
+
+    User dicts carry `id`, `email`, `name`, `role`, `hashed_password` and
+    `created_at`. `create` assigns the id and raises `UserAlreadyExists`
+    if the email is taken.
+    """
+
+    async def setup(self):
+        pass
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def create(self, user: dict) -> dict:
+        ...
+
+
+class MongoUserRepository(UserRepository):
+    def __init__(self, collection_name: str = "users"):
+        self.collection_name = collection_name
+
+    @property
+    def collection(self):
+        return get_collection(self.collection_name)
+
+    async def setup(self):
+        # The unique index is what keeps concurrent registrations consistent
+        await self.collection.create_index("email", unique=True)
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        doc = await self.collection.find_one({"email": email})
+        if doc is None:
+            return None
+        doc["id"] = str(doc.pop("_id"))
+        return doc
+
+    async def create(self, user: dict) -> dict:
+        doc = {**user, "_id": ObjectId()}
+        try:
+            await self.collection.insert_one(doc)
+        except DuplicateKeyError:
+            raise UserAlreadyExists(user["email"])
+        doc["id"] = str(doc.pop("_id"))
+        return doc
+
+
+class InMemoryUserRepository(UserRepository):
+    """Process-local store for tests and local experiments."""
+
+    def __init__(self):
+        self.users: Dict[str, dict] = {}
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        user = self.users.get(email)
+        return dict(user) if user else None
+
+    async def create(self, user: dict) -> dict:
+        if user["email"] in self.users:
+            raise UserAlreadyExists(user["email"])
+        stored = {**user, "id": uuid.uuid4().hex}
+        self.users[user["email"]] = stored
+        return dict(stored)
+
+
+_repository: Optional[UserRepository] = None
+
+def get_user_repository() -> UserRepository:
+    global _repository
+    if _repository is None:
+        _repository = InMemoryUserRepository() if USER_REPOSITORY == "memory" else MongoUserRepository()
+    return _repository
+
+def set_user_repository(repository: UserRepository):
+    global _repository
+    _repository = repository
@@ -7,6 +7,7 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
+from repositories.users import UserAlreadyExists, UserRepository, get_user_repository
 
 load_dotenv()
 
@@ -40,28 +41,11 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 router = APIRouter()
 
-# Mock user database for testing
-users_db = {
-    "test@example.com": {
-        "id": "1",
-        "email": "test@example.com",
-        "name": "Test User",
-        "role": "student",
-        "hashed_password": pwd_context.hash("password123"),
-        "created_at": datetime.now()
-    }
-}
-
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_user(email: str):
-    if email in users_db:
-        return users_db[email]
-    return None
-
-def authenticate_user(email: str, password: str):
-    user = get_user(email)
+async def authenticate_user(users: UserRepository, email: str, password: str):
+    user = await users.get_by_email(email)
     if not user:
         return False
     if not verify_password(password, user["hashed_password"]):
@@ -79,25 +63,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 @router.post("/register", response_model=Token)
-async def register(user: UserCreate):
-    if user.email in users_db:
+async def register(user: UserCreate, users: UserRepository = Depends(get_user_repository)):
+    try:
+        created = await users.create({
+            "email": user.email,
+            "name": user.name,
+            "role": "student",
+            "hashed_password": pwd_context.hash(user.password),
+            "created_at": datetime.now()
+        })
+    except UserAlreadyExists:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    hashed_password = pwd_context.hash(user.password)
-    user_id = str(len(users_db) + 1)
-    
-    users_db[user.email] = {
-        "id": user_id,
-        "email": user.email,
-        "name": user.name,
-        "role": "student",
-        "hashed_password": hashed_password,
-        "created_at": datetime.now()
-    }
-    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email}, expires_delta=access_token_expires
@@ -107,17 +87,20 @@ async def register(user: UserCreate):
         "access_token": access_token,
         "token_type": "bearer",
         "user": {
-            "id": user_id,
-            "email": user.email,
-            "name": user.name,
-            "role": "student",
-            "created_at": users_db[user.email]["created_at"]
+            "id": created["id"],
+            "email": created["email"],
+            "name": created["name"],
+            "role": created["role"],
+            "created_at": created["created_at"]
         }
     }
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    users: UserRepository = Depends(get_user_repository)
+):
+    user = await authenticate_user(users, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -146,7 +129,10 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    users: UserRepository = Depends(get_user_repository)
+):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -162,7 +148,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
         
-    user = get_user(email)
+    user = await users.get_by_email(email)
     if user is None:
         raise credentials_exception
         
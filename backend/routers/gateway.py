@@ -0,0 +1,216 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from jose import JWTError, jwt
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import httpx
+import os
+from dotenv import load_dotenv
+from starlette.background import BackgroundTask
+
+from common.admission import DEADLINE_HEADER, DeadlineExceeded, deadline_timeout, remaining_seconds
+from repositories.users import UserRepository, get_user_repository
+from routers.auth import ALGORITHM, SECRET_KEY, oauth2_scheme
+
+load_dotenv()
+
+RECOMMENDATIONS_URL = os.getenv("RECOMMENDATIONS_URL", "http://localhost:8001")
+CHATBOT_URL = os.getenv("CHATBOT_URL", "http://localhost:8002")
+ANALYTICS_URL = os.getenv("ANALYTICS_URL", "http://localhost:8003")
+
+GATEWAY_TIMEOUT = float(os.getenv("GATEWAY_TIMEOUT", "30"))
+GATEWAY_MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "100"))
+GATEWAY_MAX_KEEPALIVE = int(os.getenv("GATEWAY_MAX_KEEPALIVE", "20"))
+
+# Hop-by-hop headers must not be copied between the client and upstream
+HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host", "content-length",
+}
+
+router = APIRouter()
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+async def open_http_client():
+    global _client
+    _client = httpx.AsyncClient(
+        timeout=GATEWAY_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=GATEWAY_MAX_CONNECTIONS,
+            max_keepalive_connections=GATEWAY_MAX_KEEPALIVE,
+        ),
+    )
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise Exception("HTTP client not initialized")
+    return _client
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls onto one in-flight task."""
+
+    def __init__(self):
+        self._inflight: Dict[Any, asyncio.Task] = {}
+
+    async def do(self, key: Any, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shield so one cancelled caller does not cancel the shared request
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Any, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+
+_get_flights = SingleFlight()
+_json_flights = SingleFlight()
+
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = None
+    if not payload or payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
+def _response_headers(upstream: httpx.Response, decoded: bool) -> Dict[str, str]:
+    return {
+        key: value for key, value in upstream.headers.items()
+        if key.lower() not in HOP_HEADERS
+        # httpx decodes the body it reads, so the upstream encoding no longer applies
+        and not (decoded and key.lower() == "content-encoding")
+    }
+
+def _with_deadline(headers: Dict[str, str]) -> Dict[str, str]:
+    # Only a deadline the client or the route set is handed upstream, so
+    # upstream services otherwise apply their own route limits
+    if remaining_seconds() is None:
+        return headers
+    return {**headers, DEADLINE_HEADER: str(int(deadline_timeout() * 1000))}
+
+async def _fetch(url: str, params: Any, headers: Dict[str, str], timeout: float) -> Tuple[int, Dict[str, str], bytes]:
+    upstream = await get_http_client().get(url, params=params, headers=headers, timeout=timeout)
+    return upstream.status_code, _response_headers(upstream, decoded=True), upstream.content
+
+async def _stream(method: str, url: str, params: Any, headers: Dict[str, str], body: bytes) -> Response:
+    client = get_http_client()
+    request = client.build_request(
+        method, url, params=params, headers=_with_deadline(headers), content=body,
+        timeout=deadline_timeout(GATEWAY_TIMEOUT),
+    )
+    upstream = await client.send(request, stream=True)
+    # Pass the still-encoded body through chunk by chunk instead of buffering it
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        headers=_response_headers(upstream, decoded=False),
+        background=BackgroundTask(upstream.aclose),
+    )
+
+async def proxy(request: Request, base_url: str, claims: dict) -> Response:
+    url = base_url + request.url.path
+    params = request.query_params.multi_items()
+    # Clients must not be able to assert their own identity upstream
+    headers = {
+        key: value for key, value in request.headers.items()
+        if key.lower() not in HOP_HEADERS
+        and key.lower() not in ("authorization", DEADLINE_HEADER)
+        and not key.lower().startswith("x-user-")
+    }
+    # Upstream services trust the identity the gateway already verified
+    headers["x-user-email"] = claims["sub"]
+    if claims.get("role"):
+        headers["x-user-role"] = claims["role"]
+
+    try:
+        if request.method == "GET" and remaining_seconds() is None:
+            # Only identical requests from the same user share a response.
+            # They are buffered so every caller can be given the same body.
+            key = (url, tuple(params), tuple(sorted(headers.items())))
+            status_code, response_headers, content = await _get_flights.do(
+                key, lambda: _fetch(url, params, headers, GATEWAY_TIMEOUT)
+            )
+            return Response(content=content, status_code=status_code, headers=response_headers)
+        # A request with its own deadline gets its own upstream call carrying it
+        return await _stream(request.method, url, params, headers, await request.body())
+    except (httpx.TimeoutException, DeadlineExceeded):
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Upstream deadline exceeded")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Upstream error: {e}")
+
+
+PROXY_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+
+@router.api_route("/api/recommendations/{path:path}", methods=PROXY_METHODS)
+@router.api_route("/api/similar-courses/{path:path}", methods=PROXY_METHODS)
+async def proxy_recommendations(request: Request, claims: dict = Depends(get_token_claims)):
+    return await proxy(request, RECOMMENDATIONS_URL, claims)
+
+@router.api_route("/api/chat", methods=PROXY_METHODS)
+@router.api_route("/api/chat/{path:path}", methods=PROXY_METHODS)
+async def proxy_chatbot(request: Request, claims: dict = Depends(get_token_claims)):
+    return await proxy(request, CHATBOT_URL, claims)
+
+@router.api_route("/api/analytics/{path:path}", methods=PROXY_METHODS)
+async def proxy_analytics(request: Request, claims: dict = Depends(get_token_claims)):
+    return await proxy(request, ANALYTICS_URL, claims)
+
+
+async def _get_json(url: str) -> Any:
+    async def call():
+        timeout = deadline_timeout(GATEWAY_TIMEOUT)
+        response = await get_http_client().get(
+            url, headers={DEADLINE_HEADER: str(int(timeout * 1000))}, timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()
+    return await _json_flights.do(url, call)
+
+@router.get("/api/student-home")
+async def student_home(
+    claims: dict = Depends(get_token_claims),
+    users: UserRepository = Depends(get_user_repository)
+):
+    user = await users.get_by_email(claims["sub"])
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    user_id = user["id"]
+
+    sections = {
+        "recommendations": f"{RECOMMENDATIONS_URL}/api/recommendations/{user_id}",
+        "analytics": f"{ANALYTICS_URL}/api/analytics/student/{user_id}",
+        "predictions": f"{ANALYTICS_URL}/api/analytics/performance-predictions/{user_id}",
+    }
+    results = await asyncio.gather(
+        *[_get_json(url) for url in sections.values()], return_exceptions=True
+    )
+
+    # A failing section degrades to null instead of failing the whole page
+    payload: Dict[str, Any] = {"user_id": user_id, "errors": {}}
+    for name, result in zip(sections, results):
+        if isinstance(result, Exception):
+            payload[name] = None
+            payload["errors"][name] = str(result) or type(result).__name__
+        else:
+            payload[name] = result
+    return payload
@@ -0,0 +1,288 @@
+"""End-to-end load benchmark for the auth, recommendations, analytics and chatbot apps.
+
+Seeds MongoDB (or an in-memory mongomock store with `--mongo mock`), swaps
+Gemini for a stub with a fixed latency, drives every endpoint in-process
+with concurrent requests and prints per-endpoint latency percentiles,
+throughput, error rate and RSS growth as JSON. Every service runs in this one
+process, so RSS is reported as the growth over each scenario and each
+service's startup rather than as an absolute peak. The run exits non-zero
+if any endpoint returned errors:
+
+    python benchmarks/run.py --mongo mock --courses 10000 --progress 1000000 --output bench.json
+"""
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import httpx
+from passlib.context import CryptContext
+
+import common.database as database
+from seed import SEED_PASSWORD, SeedConfig, course_id, seed, student_id
+from stubs import StubGenerativeModel
+
+# The recommender's placeholder embedding tables only cover 1000 users/courses
+MODEL_ROWS = 1000
+
+SERVICES = {
+    "auth": "auth/main.py",
+    "recommendations": "recommendations/service.py",
+    "analytics": "analytics/service.py",
+    "chatbot": "chatbot/service.py",
+}
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+# Keeps the driver within the route's admission slots and queue, which
+# would otherwise shed the surplus with 503s
+CONCURRENCY_CAPS = {
+    "GET /api/analytics/student-clusters": 10,
+}
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def load_service(name: str):
+    path = os.path.join(REPO_ROOT, SERVICES[name])
+    # Services import their own siblings (utils, models, ...) as top-level modules
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def ensure_model_weights():
+    if os.getenv("MODEL_WEIGHTS_PATH") or os.path.exists(os.path.join(REPO_ROOT, "recommendations/model_weights.pth")):
+        return
+    import torch
+    state = {
+        "user_factors.weight": torch.randn(MODEL_ROWS, 100),
+        "course_factors.weight": torch.randn(MODEL_ROWS, 100),
+        "fc.weight": torch.randn(1, 200),
+        "fc.bias": torch.zeros(1),
+    }
+    path = os.path.join(tempfile.mkdtemp(), "model_weights.pth")
+    torch.save(state, path)
+    os.environ["MODEL_WEIGHTS_PATH"] = path
+
+
+def scenarios(name: str, module, config: SeedConfig) -> Dict[str, Callable[[random.Random], Request]]:
+    students = min(config.users, MODEL_ROWS)
+    courses = min(config.courses, MODEL_ROWS)
+
+    def any_student(rng):
+        return student_id(rng.randrange(students))
+
+    def any_course(rng):
+        return course_id(rng.randrange(courses))
+
+    if name == "auth":
+        admin = module.create_access_token({"sub": "user0@example.com", "role": "admin"})
+        student = module.create_access_token({"sub": "user1@example.com", "role": "student"})
+        return {
+            "GET /dashboard": lambda rng: ("GET", "/dashboard", {"headers": {"Authorization": f"Bearer {student}"}}),
+            "GET /instructors": lambda rng: ("GET", "/instructors", {"headers": {"Authorization": f"Bearer {admin}"}}),
+        }
+    if name == "recommendations":
+        return {
+            "GET /api/recommendations/{user_id}": lambda rng: ("GET", f"/api/recommendations/{any_student(rng)}", {}),
+            "GET /api/similar-courses/{course_id}": lambda rng: ("GET", f"/api/similar-courses/{any_course(rng)}", {}),
+        }
+    if name == "analytics":
+        return {
+            "GET /api/analytics/student/{student_id}": lambda rng: ("GET", f"/api/analytics/student/{any_student(rng)}", {}),
+            "GET /api/analytics/course/{course_id}": lambda rng: ("GET", f"/api/analytics/course/{any_course(rng)}", {}),
+            "GET /api/analytics/performance-predictions/{student_id}": lambda rng: ("GET", f"/api/analytics/performance-predictions/{any_student(rng)}", {}),
+            "GET /api/analytics/student-clusters": lambda rng: ("GET", "/api/analytics/student-clusters", {}),
+            "POST /api/analytics/students/summary": lambda rng: ("POST", "/api/analytics/students/summary", {"json": {
+                "student_ids": [any_student(rng) for _ in range(50)],
+            }}),
+        }
+    if name == "chatbot":
+        return {
+            "POST /api/chat": lambda rng: ("POST", "/api/chat", {"json": {
+                "user_id": any_student(rng), "message": "Explain recursion", "course_id": any_course(rng),
+            }}),
+            "POST /api/chat/summarize": lambda rng: ("POST", "/api/chat/summarize", {"params": {"content": "Loops repeat work."}}),
+            "POST /api/chat/generate-flashcards": lambda rng: ("POST", "/api/chat/generate-flashcards", {"params": {"content": "Variables hold values."}}),
+        }
+    raise ValueError(f"Unknown service {name}")
+
+
+async def drive(client: httpx.AsyncClient, build: Callable[[random.Random], Request], requests: int, concurrency: int, rng: random.Random) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    start_rss = rss_mb()
+    peak = start_rss
+    remaining = iter(range(requests))
+    done = asyncio.Event()
+
+    async def sample_rss():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, rss_mb())
+            await asyncio.sleep(0.01)
+
+    async def worker():
+        for _ in remaining:
+            method, url, kwargs = build(rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                code = str(response.status_code)
+            except Exception as e:
+                code = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[code] = statuses.get(code, 0) + 1
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    done.set()
+    await sampler
+
+    latencies.sort()
+    errors = sum(count for code, count in statuses.items() if not code.startswith(("2", "3")))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": errors / len(latencies) if latencies else 0.0,
+        "statuses": statuses,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else 0.0,
+        },
+        "peak_rss_delta_mb": max(peak, rss_mb()) - start_rss,
+    }
+
+
+@asynccontextmanager
+async def service_mongo(args, client):
+    if args.mongo != "mock":
+        # Real servers: let the service lifespan open its own pooled client
+        database.MONGODB_URL = args.mongo
+        yield
+        return
+    # mongomock keeps data per client, so every lifespan must reuse the seeded one
+    original = database.AsyncIOMotorClient
+    database.AsyncIOMotorClient = lambda *args, **kwargs: client
+    try:
+        yield
+    finally:
+        database.AsyncIOMotorClient = original
+
+async def bench_service(name: str, args, config: SeedConfig, client) -> Dict[str, Any]:
+    if name == "recommendations":
+        ensure_model_weights()
+    start_rss = rss_mb()
+    module = load_service(name)
+    if name == "chatbot":
+        module.model = StubGenerativeModel(args.llm_latency_ms)
+
+    app = module.app
+    rng = random.Random(config.seed)
+    results: Dict[str, Any] = {}
+    async with service_mongo(args, client):
+        async with app.router.lifespan_context(app):
+            results["startup_rss_delta_mb"] = rss_mb() - start_rss
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+                for endpoint, build in scenarios(name, module, config).items():
+                    # Warm caches and lazy imports before measuring
+                    await drive(http, build, min(args.warmup, args.requests), 1, rng)
+                    concurrency = min(args.concurrency, CONCURRENCY_CAPS.get(endpoint, args.concurrency))
+                    results[endpoint] = await drive(http, build, args.requests, concurrency, rng)
+    return results
+
+
+def make_client(url: str):
+    if url == "mock":
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(url)
+
+async def main(args) -> Dict[str, Any]:
+    config = SeedConfig(
+        users=args.users, courses=args.courses, progress=args.progress, seed=args.seed
+    )
+    client = make_client(args.mongo)
+    report: Dict[str, Any] = {"config": {**config.model_dump(), **vars(args)}, "results": {}}
+
+    if not args.skip_seed:
+        started = time.perf_counter()
+        hashed = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(SEED_PASSWORD)
+        report["seed"] = await seed(client, config, hashed)
+        report["seed_seconds"] = time.perf_counter() - started
+
+    for name in args.services:
+        report["results"][name] = await bench_service(name, args, config, client)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--services", nargs="+", choices=list(SERVICES), default=list(SERVICES))
+    parser.add_argument("--mongo", default=os.getenv("MONGODB_URL", "mock"),
+                        help="MongoDB URL, or 'mock' for an in-memory mongomock store")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--progress", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse data already in --mongo")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    report = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+    failed = [
+        f"{service} {endpoint}: {row['errors']}/{row['requests']} errors {row['statuses']}"
+        for service, rows in results["results"].items()
+        for endpoint, row in rows.items()
+        if isinstance(row, dict) and row["errors"]
+    ]
+    if failed:
+        sys.exit("Endpoints returned errors:\n" + "\n".join(failed))
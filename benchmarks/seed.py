@@ -0,0 +1,105 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+import random
+
+WORDS = (
+    "python data machine learning web design algebra calculus history biology "
+    "chemistry physics statistics writing marketing finance security cloud "
+    "network database frontend backend mobile testing ethics research art "
+    "music economics geometry literature philosophy robotics vision language"
+).split()
+
+# Every seeded user shares this password; hashing it once keeps seeding fast
+SEED_PASSWORD = "benchmark-password"
+
+
+class SeedConfig(BaseModel):
+    users: int = 1000
+    courses: int = 500
+    progress: int = 20000
+    chunk_size: int = 10000
+    seed: int = 42
+
+
+def course_id(index: int) -> str:
+    return f"course-{index:06d}"
+
+def student_id(index: int) -> str:
+    # The recommender casts student ids to int, so keep them numeric
+    return str(index)
+
+
+def generate_courses(config: SeedConfig, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    for i in range(config.courses):
+        topics = rng.sample(WORDS, 4)
+        yield {
+            "_id": course_id(i),
+            "title": " ".join(word.title() for word in topics[:2]),
+            "description": " ".join(rng.choices(WORDS, k=40)),
+            "topics": topics,
+            "enrollment_count": rng.randint(0, 5000),
+        }
+
+def generate_progress(config: SeedConfig, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    for _ in range(config.progress):
+        yield {
+            "student_id": student_id(rng.randrange(config.users)),
+            "course_id": course_id(rng.randrange(config.courses)),
+            "overall_progress": rng.random(),
+            "completed_modules": [f"module-{m}" for m in range(rng.randint(0, 10))],
+            # The analytics feature means are NaN for a record without any score
+            "quiz_scores": [{"score": rng.uniform(40, 100)} for _ in range(rng.randint(1, 5))],
+        }
+
+def generate_users(config: SeedConfig, rng: random.Random, hashed_password: str) -> Iterator[Dict[str, Any]]:
+    now = datetime.now()
+    for i in range(config.users):
+        role = "admin" if i == 0 else ("instructor" if i % 20 == 0 else "student")
+        yield {
+            "email": f"user{i}@example.com",
+            "username": f"user{i}",
+            "hashed_password": hashed_password,
+            "full_name": f"User {i}",
+            "role": role,
+            "is_active": True,
+            "is_verified": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+async def _insert(collection, documents: Iterator[Dict[str, Any]], chunk_size: int) -> int:
+    total = 0
+    chunk: List[Dict[str, Any]] = []
+    for doc in documents:
+        chunk.append(doc)
+        if len(chunk) >= chunk_size:
+            await collection.insert_many(chunk, ordered=False)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        await collection.insert_many(chunk, ordered=False)
+        total += len(chunk)
+    return total
+
+async def seed(client, config: SeedConfig, hashed_password: str) -> Dict[str, int]:
+    """Drop and refill the collections every service reads.
+
+    `client` may be a Motor client or a mongomock-motor client.
+    """
+    rng = random.Random(config.seed)
+    platform = client["phn_platform"]
+    auth = client["elearning_db"]
+    for collection in (platform.courses, platform.student_progress, auth.users):
+        await collection.drop()
+
+    counts = {
+        "courses": await _insert(platform.courses, generate_courses(config, rng), config.chunk_size),
+        "student_progress": await _insert(platform.student_progress, generate_progress(config, rng), config.chunk_size),
+        "users": await _insert(auth.users, generate_users(config, rng, hashed_password), config.chunk_size),
+    }
+    await platform.student_progress.create_index("student_id")
+    await platform.student_progress.create_index("course_id")
+    await auth.users.create_index("email", unique=True)
+    return counts
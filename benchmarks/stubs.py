@@ -0,0 +1,29 @@
+import time
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """Drop-in for `genai.GenerativeModel` that sleeps instead of calling Gemini.
+
+    The sleep is blocking on purpose: the real `generate_content` call is
+    synchronous too, so the stub keeps the service's concurrency profile.
+    `request_options` and other SDK keyword arguments are accepted and ignored.
+    """
+
+    def __init__(self, latency_ms: float = 200.0):
+        self.latency_ms = latency_ms
+
+    def generate_content(self, prompt: str, **kwargs) -> StubResponse:
+        time.sleep(self.latency_ms / 1000)
+        return StubResponse(
+            "Here is a short answer.\n"
+            "Front: What is a variable?\n"
+            "Back: A named value.\n"
+            "Front: What is a loop?\n"
+            "Back: Repeated execution.\n"
+            "Source: course notes"
+        )
@@ -0,0 +1,149 @@
+"""Worker scaling benchmark for the gunicorn profiles.
+
+Starts recommendations or analytics under its `gunicorn.conf.py` with a
+growing number of workers, once with shared artifacts and once with every
+worker building its own. It reports startup time, the RSS and PSS of each
+worker and the total PSS of master plus workers as JSON. PSS counts shared
+pages once across processes, so it shows what the host actually pays:
+
+    python benchmarks/run.py --mongo mongodb://localhost:27017 --requests 1   # seed once
+    python benchmarks/workers.py --service recommendations --mongo mongodb://localhost:27017 --workers 1 2 4 8
+
+Needs a real MongoDB server and Linux (`/proc`).
+"""
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import httpx
+
+from seed import course_id, student_id
+
+STARTUP_LINE = "Application startup complete"
+
+WARMUP_PATHS = {
+    "recommendations": lambda rng, args: rng.choice([
+        f"/api/recommendations/{student_id(rng.randrange(args.users))}",
+        f"/api/similar-courses/{course_id(rng.randrange(args.courses))}",
+    ]),
+    "analytics": lambda rng, args: f"/api/analytics/performance-predictions/{student_id(rng.randrange(args.users))}",
+}
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                memory[key.lower()] = int(rest.split()[0]) / 1024
+    return memory
+
+def children(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def run_profile(args, workers: int, shared: bool, port: int) -> Dict[str, Any]:
+    artifacts = tempfile.mkdtemp(prefix="artifacts-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.getenv("PYTHONPATH")])),
+        MONGODB_URL=args.mongo,
+        WEB_CONCURRENCY=str(workers),
+        BIND=f"127.0.0.1:{port}",
+        # An empty directory turns sharing off in gunicorn.conf.py
+        SHARED_ARTIFACTS_DIR=artifacts if shared else "",
+    )
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "service:app"],
+        cwd=os.path.join(REPO_ROOT, args.service),
+        env=env,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    ready = threading.Event()
+    log: List[str] = []
+
+    def watch():
+        booted = 0
+        for line in process.stderr:
+            log.append(line)
+            if STARTUP_LINE in line:
+                booted += 1
+                if booted == workers:
+                    ready.set()
+
+    threading.Thread(target=watch, daemon=True).start()
+    try:
+        if not ready.wait(args.startup_timeout):
+            raise RuntimeError(f"{workers} workers did not start:\n{''.join(log[-20:])}")
+        startup_seconds = time.perf_counter() - started
+
+        # Touch the mapped pages the way real traffic would before measuring
+        rng = random.Random(args.seed)
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            for _ in range(args.warmup):
+                client.get(WARMUP_PATHS[args.service](rng, args))
+
+        worker_memory = [memory_mb(pid) for pid in children(process.pid)]
+        master_memory = memory_mb(process.pid)
+        return {
+            "mode": "shared" if shared else "per-worker",
+            "workers": workers,
+            "startup_seconds": startup_seconds,
+            "worker_rss_mb": sum(m["rss"] for m in worker_memory) / len(worker_memory),
+            "worker_pss_mb": sum(m["pss"] for m in worker_memory) / len(worker_memory),
+            "master_rss_mb": master_memory["rss"],
+            "total_pss_mb": master_memory["pss"] + sum(m["pss"] for m in worker_memory),
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        shutil.rmtree(artifacts, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RSS and startup time per gunicorn worker count")
+    parser.add_argument("--service", choices=sorted(WARMUP_PATHS), default="recommendations")
+    parser.add_argument("--mongo", default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--modes", nargs="+", choices=["shared", "per-worker"], default=["shared", "per-worker"])
+    parser.add_argument("--users", type=int, default=1000, help="Seeded users to sample during warmup")
+    parser.add_argument("--courses", type=int, default=500, help="Seeded courses to sample during warmup")
+    parser.add_argument("--warmup", type=int, default=200, help="Requests sent before measuring memory")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        for workers in args.workers:
+            result = run_profile(args, workers, mode == "shared", args.port)
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+    report = json.dumps({"service": args.service, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
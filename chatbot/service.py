@@ -1,10 +1,14 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
-from motor.motor_asyncio import AsyncIOMotorClient
+from common.database import mongo_lifespan, get_collection, projection
+from common.metrics import instrument, timed
+from common.admission import Limit, admission_control, deadline_timeout, to_http_exception
 
 # Load environment variables
 load_dotenv()
@@ -12,18 +16,48 @@ load_dotenv()
 app = FastAPI(
     title="AI Chatbot Service",
     description="GPT-based chatbot for educational Q&A assistance",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=mongo_lifespan("chatbot", "phn_platform")
 )
+# Each request holds a Gemini call open, so cap them well below the worker pool.
+# The group makes all three routes share the same 8 slots.
+LLM_LIMIT = Limit(concurrency=8, queue=32, timeout_ms=30000, group="llm")
+admission_control(app, {
+    "/api/chat": LLM_LIMIT,
+    "/api/chat/summarize": LLM_LIMIT,
+    "/api/chat/generate-flashcards": LLM_LIMIT,
+})
+instrument(app)
 
 # Configure Gemini AI
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 genai.configure(api_key=GOOGLE_API_KEY)
 model = genai.GenerativeModel('gemini-pro')
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+# Sized to the admission limit: a call abandoned on timeout keeps its thread
+# until the SDK gives up, and later calls wait here instead of piling up threads
+llm_executor = ThreadPoolExecutor(max_workers=LLM_LIMIT.concurrency, thread_name_prefix="gemini")
 
-# MongoDB connection
-MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGODB_URL)
-db = client.phn_platform
+async def generate(prompt: str):
+    # The SDK call blocks, so run it off the event loop and bound it by the request deadline
+    timeout = deadline_timeout(LLM_TIMEOUT)
+    loop = asyncio.get_running_loop()
+    with timed("llm_generate"):
+        return await asyncio.wait_for(
+            loop.run_in_executor(
+                llm_executor,
+                lambda: model.generate_content(prompt, request_options={"timeout": timeout}),
+            ),
+            timeout,
+        )
+
+# Course fields needed to build the prompt context
+class CourseContext(BaseModel):
+    title: str
+    description: str
+    topics: List[str] = []
+
+COURSE_CONTEXT = projection(CourseContext)
 
 class ChatMessage(BaseModel):
     user_id: str
@@ -46,7 +80,9 @@ async def chat(message: ChatMessage):
         # Get course context if course_id is provided
         context = ""
         if message.course_id:
-            course = await db.courses.find_one({"_id": message.course_id})
+            course = await get_collection("courses").find_one(
+                {"_id": message.course_id}, COURSE_CONTEXT
+            )
             if course:
                 context = f"Course: {course['title']}\nDescription: {course['description']}\nTopics: {', '.join(course['topics'])}\n\n"
         
@@ -65,7 +101,7 @@ async def chat(message: ChatMessage):
         """
         
         # Generate response using Gemini
-        response = model.generate_content(prompt)
+        response = await generate(prompt)
         
         # Extract sources from response if any
         sources = []
@@ -82,7 +118,7 @@ async def chat(message: ChatMessage):
         )
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise to_http_exception(e)
 
 @app.post("/api/chat/summarize")
 async def summarize_content(content: str):
@@ -94,7 +130,7 @@ async def summarize_content(content: str):
         Focus on the key points and main concepts. Use bullet points for better readability.
         """
         
-        response = model.generate_content(prompt)
+        response = await generate(prompt)
         
         return {
             "summary": response.text,
@@ -102,7 +138,7 @@ async def summarize_content(content: str):
         }
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise to_http_exception(e)
 
 @app.post("/api/chat/generate-flashcards")
 async def generate_flashcards(content: str, num_cards: int = 5):
@@ -118,7 +154,7 @@ async def generate_flashcards(content: str, num_cards: int = 5):
         Make the questions challenging but fair, and ensure the answers are clear and concise.
         """
         
-        response = model.generate_content(prompt)
+        response = await generate(prompt)
         
         # Parse flashcards from response
         flashcards = []
@@ -141,7 +177,7 @@ async def generate_flashcards(content: str, num_cards: int = 5):
         }
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise to_http_exception(e)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,238 @@
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+from pydantic import BaseModel
+from pymongo.errors import ExecutionTimeout, NetworkTimeout, ServerSelectionTimeoutError
+from starlette.routing import Match
+from contextvars import ContextVar
+from typing import Dict, Optional
+import asyncio
+import json
+import os
+import pymongo
+import time
+
+DEADLINE_HEADER = "x-request-timeout-ms"
+RETRY_AFTER = os.getenv("ADMISSION_RETRY_AFTER", "1")
+
+# Routes that must stay reachable while the service is saturated
+UNLIMITED_ROUTES = {"/health", "/metrics"}
+
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Requests currently executing", ["route"])
+ADMISSION_QUEUED = Gauge("admission_queued", "Requests waiting for a slot", ["route"])
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests shed by admission control", ["route", "reason"])
+ADMISSION_LIMIT = Gauge("admission_limit", "Configured admission limits", ["route", "kind"])
+
+# Absolute time.monotonic() deadline of the request being handled
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class Limit(BaseModel):
+    """Admission settings for one route.
+
+    `concurrency` requests run at once and up to `queue` more wait for a slot;
+    anything beyond that gets an immediate 503. `timeout_ms` is the deadline
+    applied when the client does not send one; leave it unset on streaming
+    routes, whose body is sent under the same deadline. Routes with the same
+    `group` share one set of slots, created from the first of them to be hit.
+    """
+    concurrency: int = 64
+    queue: int = 256
+    timeout_ms: Optional[int] = None
+    group: Optional[str] = None
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def remaining_seconds() -> Optional[float]:
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def deadline_timeout(default: Optional[float] = None) -> Optional[float]:
+    """The tighter of `default` and the time left on the request deadline."""
+    remaining = remaining_seconds()
+    if remaining is None:
+        return default
+    if remaining <= 0:
+        raise DeadlineExceeded()
+    return remaining if default is None else min(default, remaining)
+
+def to_http_exception(e: Exception) -> HTTPException:
+    """Map an unexpected handler error to 504 for timeouts, 500 otherwise."""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, (DeadlineExceeded, asyncio.TimeoutError, ExecutionTimeout, NetworkTimeout, ServerSelectionTimeoutError)):
+        return HTTPException(status_code=504, detail="Request deadline exceeded")
+    return HTTPException(status_code=500, detail=str(e))
+
+
+def export_limit(route: str, limit: Limit):
+    ADMISSION_LIMIT.labels(route, "concurrency").set(limit.concurrency)
+    ADMISSION_LIMIT.labels(route, "queue").set(limit.queue)
+    if limit.timeout_ms is not None:
+        ADMISSION_LIMIT.labels(route, "timeout_ms").set(limit.timeout_ms)
+
+
+class _RouteLimiter:
+    def __init__(self, route: str, limit: Limit):
+        self.route = route
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit.concurrency)
+        self.waiting = 0
+        export_limit(route, limit)
+
+    async def acquire(self, timeout: Optional[float]) -> Optional[str]:
+        """Take a slot, or return why the request was shed."""
+        if self.semaphore.locked() and self.waiting >= self.limit.queue:
+            return "queue_full"
+        self.waiting += 1
+        ADMISSION_QUEUED.labels(self.route).inc()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return "deadline"
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUED.labels(self.route).dec()
+        ADMISSION_IN_FLIGHT.labels(self.route).inc()
+        return None
+
+    def release(self):
+        ADMISSION_IN_FLIGHT.labels(self.route).dec()
+        self.semaphore.release()
+
+
+def load_limits(limits: Dict[str, Limit], default: Limit):
+    """Apply `ADMISSION_DEFAULT_*` and `ADMISSION_LIMITS` overrides from the environment."""
+    default_overrides = {}
+    for field in ("concurrency", "queue", "timeout_ms"):
+        raw = os.getenv(f"ADMISSION_DEFAULT_{field.upper()}")
+        if raw:
+            default_overrides[field] = int(raw)
+    default = default.model_copy(update=default_overrides)
+
+    # e.g. ADMISSION_LIMITS='{"/api/chat": {"concurrency": 4, "queue": 8}}'
+    overrides = json.loads(os.getenv("ADMISSION_LIMITS", "{}"))
+    merged = {route: limit.model_copy() for route, limit in limits.items()}
+    for route, values in overrides.items():
+        merged[route] = merged.get(route, default).model_copy(update=values)
+    return merged, default
+
+
+class AdmissionMiddleware:
+    """Per-route concurrency limits, bounded queues and request deadlines.
+
+    Requests over the queue cap, or whose deadline runs out while queued,
+    get a 503 with Retry-After. The deadline is the route's `timeout_ms`,
+    tightened (never extended) by an `X-Request-Timeout-Ms` header. It is
+    stored for `deadline_timeout()` and applied to every MongoDB operation
+    via `pymongo.timeout`, which sets `maxTimeMS` on the server side.
+    `limits` and `default` are expected to have gone through `load_limits`.
+    """
+
+    def __init__(self, app, router, limits: Dict[str, Limit], default: Limit):
+        self.app = app
+        self.router = router
+        self.limits = limits
+        self.default = default
+        self.limiters: Dict[str, _RouteLimiter] = {}
+
+    def _match(self, scope):
+        for route in self.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    def _limiter(self, path: str) -> _RouteLimiter:
+        limit = self.limits.get(path, self.default)
+        key = limit.group or path
+        limiter = self.limiters.get(key)
+        if limiter is None:
+            limiter = _RouteLimiter(key, limit)
+            self.limiters[key] = limiter
+        return limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = self._match(scope)
+        path = getattr(route, "path", None)
+        if path is None or path in UNLIMITED_ROUTES:
+            await self.app(scope, receive, send)
+            return
+        # Lets the metrics middleware label shed requests with their route
+        scope["route"] = route
+
+        limiter = self._limiter(path)
+        timeout_ms = self.limits.get(path, self.default).timeout_ms
+        requested = self._requested_timeout_ms(scope)
+        if requested is not None:
+            timeout_ms = requested if timeout_ms is None else min(requested, timeout_ms)
+        timeout = timeout_ms / 1000 if timeout_ms is not None else None
+
+        started = time.monotonic()
+        reason = await limiter.acquire(timeout)
+        if reason is not None:
+            ADMISSION_REJECTED.labels(limiter.route, reason).inc()
+            await self._reject(send, reason)
+            return
+        token = _deadline.set(started + timeout if timeout is not None else None)
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= 0:
+            _deadline.reset(token)
+            limiter.release()
+            ADMISSION_REJECTED.labels(limiter.route, "deadline").inc()
+            await self._reject(send, "deadline")
+            return
+        try:
+            with pymongo.timeout(remaining):
+                await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
+            limiter.release()
+
+    @staticmethod
+    def _requested_timeout_ms(scope) -> Optional[int]:
+        for name, value in scope["headers"]:
+            if name == DEADLINE_HEADER.encode():
+                try:
+                    timeout_ms = int(value)
+                except ValueError:
+                    return None
+                return timeout_ms if timeout_ms > 0 else None
+        return None
+
+    async def _reject(self, send, reason: str):
+        body = json.dumps({"detail": f"Service overloaded ({reason}), retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", RETRY_AFTER.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def admission_control(app, limits: Optional[Dict[str, Limit]] = None, default: Optional[Limit] = None):
+    """Install `AdmissionMiddleware` on `app`.
+
+    Call before `instrument(app)` so request metrics also cover shed requests.
+    The configured limits are exported right away, before any route is hit.
+    """
+    limits, default = load_limits(limits or {}, default or Limit())
+    export_limit("default", default)
+    for route, limit in limits.items():
+        export_limit(limit.group or route, limit)
+    app.add_middleware(
+        AdmissionMiddleware,
+        router=app.router,
+        limits=limits,
+        default=default,
+    )
@@ -0,0 +1,168 @@
+"""Read-only artifacts shared by every worker of a service.
+
+With `SHARED_ARTIFACTS_DIR` set, the gunicorn master builds a service's
+models, indexes and catalog once (see each service's `gunicorn.conf.py`) and
+writes them as `.npy` files under `<SHARED_ARTIFACTS_DIR>/<service>/<version>`.
+Workers open them with `np.load(mmap_mode=...)`, so every process maps the
+same page-cache pages instead of holding its own copy. Point the directory
+at a tmpfs such as `/dev/shm` to keep the pages in shared memory.
+
+A `current` symlink names the newest version. Workers resolve it once at
+startup, so a rebuild on `SIGHUP` is picked up by the replacement workers
+while old ones keep the files they already mapped.
+"""
+from typing import Awaitable, Callable, Iterator, Optional, Sequence
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+import scipy.sparse as sp
+
+SHARED_ARTIFACTS_DIR = "SHARED_ARTIFACTS_DIR"
+
+logger = logging.getLogger("common.artifacts")
+
+
+def shared_root(service: str) -> Optional[str]:
+    root = os.getenv(SHARED_ARTIFACTS_DIR)
+    return os.path.join(root, service) if root else None
+
+def current_artifacts(service: str) -> Optional[str]:
+    """The published artifact directory for `service`, if shared serving is on."""
+    root = shared_root(service)
+    if root is None:
+        return None
+    link = os.path.join(root, "current")
+    if not os.path.exists(link):
+        logger.warning("%s is set but no artifacts were published for %s", SHARED_ARTIFACTS_DIR, service)
+        return None
+    return os.path.realpath(link)
+
+def publish(service: str, build: Callable[[str], Awaitable[None]]) -> str:
+    """Run `build(directory)` and make its output the current version.
+
+    Meant for the gunicorn master: it runs its own event loop and must not
+    leave connections open across the fork.
+    """
+    root = shared_root(service)
+    if root is None:
+        raise RuntimeError(f"{SHARED_ARTIFACTS_DIR} is not set")
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+    directory = os.path.join(root, version)
+    os.makedirs(directory)
+    started = time.perf_counter()
+    asyncio.run(build(directory))
+
+    link = os.path.join(root, "current")
+    staging = f"{link}.{os.getpid()}"
+    os.symlink(version, staging)
+    os.replace(staging, link)
+    # Workers that already mapped an old version keep it until they exit
+    for entry in os.listdir(root):
+        if entry not in (version, "current"):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    logger.info("Published %s artifacts %s in %.1fs", service, version, time.perf_counter() - started)
+    return directory
+
+
+def save_array(directory: str, name: str, array: np.ndarray):
+    np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+
+def load_array(directory: str, name: str, writable: bool = False) -> np.ndarray:
+    """Map an array without reading it into private memory.
+
+    `writable` gives a copy-on-write mapping for consumers such as
+    `torch.from_numpy` that refuse read-only buffers; pages are only
+    copied if something actually writes to them.
+    """
+    path = os.path.join(directory, f"{name}.npy")
+    try:
+        return np.load(path, mmap_mode="c" if writable else "r")
+    except ValueError:
+        # Empty arrays have nothing to map
+        return np.load(path)
+
+def save_csr(directory: str, name: str, matrix: sp.csr_matrix):
+    matrix = sp.csr_matrix(matrix)
+    matrix.sort_indices()
+    save_array(directory, f"{name}.data", matrix.data)
+    save_array(directory, f"{name}.indices", matrix.indices)
+    save_array(directory, f"{name}.indptr", matrix.indptr)
+    save_array(directory, f"{name}.shape", np.array(matrix.shape, dtype=np.int64))
+
+def load_csr(directory: str, name: str) -> sp.csr_matrix:
+    shape = tuple(int(size) for size in load_array(directory, f"{name}.shape"))
+    matrix = sp.csr_matrix(
+        (
+            load_array(directory, f"{name}.data"),
+            load_array(directory, f"{name}.indices"),
+            load_array(directory, f"{name}.indptr"),
+        ),
+        shape=shape,
+        copy=False,
+    )
+    matrix.has_sorted_indices = True
+    return matrix
+
+def save_json(directory: str, name: str, value):
+    with open(os.path.join(directory, f"{name}.json"), "w") as f:
+        json.dump(value, f)
+
+def load_json(directory: str, name: str):
+    with open(os.path.join(directory, f"{name}.json")) as f:
+        return json.load(f)
+
+
+class IdIndex:
+    """A `{id: position}` lookup over mapped arrays instead of a dict.
+
+    Ids are kept in their original order plus a sorted copy for binary
+    search, so a million ids cost no per-worker Python objects.
+    """
+
+    def __init__(self, ids: np.ndarray, sorted_ids: np.ndarray, order: np.ndarray):
+        self.ids = ids
+        self.sorted_ids = sorted_ids
+        self.order = order
+
+    def get(self, key: str, default: Optional[int] = None) -> Optional[int]:
+        pos = int(np.searchsorted(self.sorted_ids, key))
+        if pos < len(self.sorted_ids) and self.sorted_ids[pos] == key:
+            return int(self.order[pos])
+        return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str) -> int:
+        pos = self.get(key)
+        if pos is None:
+            raise KeyError(key)
+        return pos
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[str]:
+        return (str(value) for value in self.ids)
+
+    def id_at(self, pos: int) -> str:
+        return str(self.ids[pos])
+
+def save_ids(directory: str, name: str, ids: Sequence[str]):
+    array = np.array([str(value) for value in ids], dtype=np.str_)
+    order = np.argsort(array, kind="stable")
+    save_array(directory, f"{name}.ids", array)
+    save_array(directory, f"{name}.sorted", array[order])
+    save_array(directory, f"{name}.order", order.astype(np.int64))
+
+def load_ids(directory: str, name: str) -> IdIndex:
+    return IdIndex(
+        load_array(directory, f"{name}.ids"),
+        load_array(directory, f"{name}.sorted"),
+        load_array(directory, f"{name}.order"),
+    )
+
@@ -0,0 +1,133 @@
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from common.metrics import CollectionListener, MongoMetrics
+from typing import Any, Dict, Iterable, Optional, Type
+import logging
+import os
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+SLOW_QUERY_MS = int(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+
+logger = logging.getLogger("common.database")
+
+# One client per process, created by the app lifespan rather than at import
+client: Optional[AsyncIOMotorClient] = None
+database: Optional[AsyncIOMotorDatabase] = None
+
+
+class PoolSettings(BaseModel):
+    """Connection pool options for one service.
+
+    Every field can be overridden per pod with `<SERVICE>_MONGO_<FIELD>`,
+    e.g. `ANALYTICS_MONGO_MAX_POOL_SIZE=20`.
+    """
+    max_pool_size: int = 100
+    min_pool_size: int = 0
+    max_idle_time_ms: Optional[int] = None
+    wait_queue_timeout_ms: Optional[int] = None
+    server_selection_timeout_ms: int = 5000
+
+    @classmethod
+    def from_env(cls, service: str) -> "PoolSettings":
+        prefix = f"{service.upper()}_MONGO_"
+        values = {}
+        for field in cls.model_fields:
+            raw = os.getenv(prefix + field.upper())
+            if raw:
+                values[field] = int(raw)
+        return cls(**values)
+
+    def client_kwargs(self) -> Dict[str, Any]:
+        kwargs = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+        }
+        if self.max_idle_time_ms is not None:
+            kwargs["maxIdleTimeMS"] = self.max_idle_time_ms
+        if self.wait_queue_timeout_ms is not None:
+            kwargs["waitQueueTimeoutMS"] = self.wait_queue_timeout_ms
+        return kwargs
+
+
+class SlowQueryLogger(CollectionListener):
+    """Logs every Mongo command that takes longer than `threshold_ms`."""
+
+    def __init__(self, threshold_ms: int = SLOW_QUERY_MS):
+        super().__init__()
+        self.threshold_ms = threshold_ms
+
+    def finished(self, event, collection: str, outcome: str):
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= self.threshold_ms:
+            logger.warning(
+                "Slow Mongo command %s on %s.%s took %.1fms (%s)",
+                event.command_name,
+                event.database_name,
+                collection,
+                duration_ms,
+                outcome,
+            )
+
+
+async def connect_to_mongo(service: str, database_name: str):
+    global client, database
+    settings = PoolSettings.from_env(service)
+    try:
+        client = AsyncIOMotorClient(
+            MONGODB_URL,
+            appname=service,
+            event_listeners=[SlowQueryLogger(), MongoMetrics()],
+            **settings.client_kwargs(),
+        )
+        database = client[os.getenv("MONGODB_DB", database_name)]
+        await client.admin.command('ping')
+        logger.info("%s connected to MongoDB (pool %s)", service, settings.max_pool_size)
+    except Exception as e:
+        logger.error("Error connecting to MongoDB: %s", e)
+        raise e
+
+async def close_mongo_connection():
+    global client, database
+    if client:
+        client.close()
+        client = None
+        database = None
+        logger.info("MongoDB connection closed!")
+
+def mongo_lifespan(service: str, database_name: str):
+    """Build a FastAPI lifespan that owns the Mongo client for `service`."""
+    @asynccontextmanager
+    async def lifespan(app):
+        await connect_to_mongo(service, database_name)
+        try:
+            yield
+        finally:
+            await close_mongo_connection()
+    return lifespan
+
+def get_database() -> AsyncIOMotorDatabase:
+    if database is None:
+        raise Exception("Database not initialized")
+    return database
+
+def get_collection(collection_name: str) -> Any:
+    db = get_database()
+    return db[collection_name]
+
+def projection(model: Type[BaseModel], exclude: Iterable[str] = ()) -> Dict[str, int]:
+    """Inclusion projection covering exactly the fields declared on `model`."""
+    excluded = set(exclude)
+    fields = {}
+    for name, field in model.model_fields.items():
+        if name in excluded:
+            continue
+        key = field.validation_alias if isinstance(field.validation_alias, str) else field.alias
+        fields[key or name] = 1
+    if "_id" not in fields:
+        fields["_id"] = 0
+    return fields
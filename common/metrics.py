@@ -0,0 +1,161 @@
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    REGISTRY,
+)
+from pymongo import monitoring
+from fastapi import Response
+from contextlib import contextmanager
+from typing import Any, Dict
+import cProfile
+import io
+import os
+import pstats
+import time
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_PREFIX = "/debug/profile"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests",
+    ["method", "route", "status"],
+)
+SECTION_DURATION = Histogram(
+    "hot_section_duration_seconds",
+    "Time spent in instrumented hot sections (model scoring, LLM calls, bcrypt, ...)",
+    ["section"],
+)
+MONGO_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "Time spent in MongoDB commands",
+    ["command", "collection", "outcome"],
+)
+
+
+@contextmanager
+def timed(section: str):
+    """Record the duration of the enclosed block under `section`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SECTION_DURATION.labels(section).observe(time.perf_counter() - start)
+
+
+class CollectionListener(monitoring.CommandListener):
+    """Hands every finished Mongo command to `finished` with its collection.
+
+    pymongo only reports the collection when a command starts, so it is kept
+    by request id until the command succeeds or fails.
+    """
+
+    def __init__(self):
+        self._collections: Dict[int, Any] = {}
+
+    def started(self, event):
+        self._collections[event.request_id] = event.command.get(event.command_name)
+
+    def succeeded(self, event):
+        self.finished(event, self._pop(event), "ok")
+
+    def failed(self, event):
+        self.finished(event, self._pop(event), "failed")
+
+    def _pop(self, event) -> str:
+        collection = self._collections.pop(event.request_id, None)
+        # Database-level commands such as `aggregate: 1` name no collection
+        return collection if isinstance(collection, str) else ""
+
+    def finished(self, event, collection: str, outcome: str):
+        raise NotImplementedError
+
+
+class MongoMetrics(CollectionListener):
+    """Feeds every Mongo command into `mongo_command_duration_seconds`."""
+
+    def finished(self, event, collection: str, outcome: str):
+        MONGO_DURATION.labels(event.command_name, collection, outcome).observe(
+            event.duration_micros / 1_000_000
+        )
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request by its route template.
+
+    With PROFILING_ENABLED set, `/debug/profile/<path>` runs `<path>` under
+    cProfile and answers with the pstats report instead of the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if PROFILING_ENABLED and scope["path"].startswith(PROFILE_PREFIX + "/"):
+            await self._profile(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Use the matched route template so label cardinality stays bounded
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status["code"]),
+            ).observe(time.perf_counter() - start)
+
+    async def _profile(self, scope, receive, send):
+        inner_path = scope["path"][len(PROFILE_PREFIX):]
+        inner_scope = {**scope, "path": inner_path, "raw_path": inner_path.encode()}
+
+        async def discard(message):
+            pass
+
+        # cProfile sees every coroutine the loop runs meanwhile, so use it on a quiet pod
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(inner_scope, receive, discard)
+        finally:
+            profiler.disable()
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(50)
+        body = out.getvalue().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def metrics_response():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Aggregate the per-worker files written by every process
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+def instrument(app):
+    """Add request timing and a Prometheus `/metrics` endpoint to `app`."""
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_response, methods=["GET"], include_in_schema=False)
@@ -0,0 +1,251 @@
+"""Incrementally maintained TF-IDF index over course descriptions.
+
+Terms are hashed into a fixed vocabulary with `HashingVectorizer`, so adding
+or editing a course never changes the feature space. Document frequencies
+are kept as a running count and each course is weighted with the same
+smoothed idf `TfidfVectorizer` uses, `log((1 + n) / (1 + df)) + 1`, then
+L2-normalised. Neighbour lists hold the top `n_neighbours` courses by cosine
+similarity.
+
+Drift compared with a full refit:
+
+- `upsert` re-weights only the course being written, with the idf at that
+  moment. Every other course keeps the idf from when it was last weighted,
+  so their relative weights slowly drift as the catalog changes.
+- Neighbour lists only change for pairs that involve the written course. If
+  that course leaves a full list, the next-best course cannot be recovered
+  without a full pass, so the list is left one entry short.
+- Hash collisions merge unrelated terms. With the default 2**18 features
+  this is negligible for course-sized texts.
+
+`compacted()` re-weights every course from the stored term counts with the
+current idf and recomputes every neighbour list. Its result is identical to
+a fresh `build`. Run it periodically to bound the drift.
+
+`save()` writes the weighted matrix and neighbour lists as `.npy` arrays
+that `SharedContentIndex` maps read-only, so several workers can serve one
+copy of the index (see `common/artifacts.py`).
+"""
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+import scipy.sparse as sp
+
+from common.artifacts import load_array, load_csr, load_ids, save_array, save_csr, save_ids
+
+N_FEATURES = 2 ** 18
+N_NEIGHBOURS = 50
+SIMILARITY_BLOCK = 1024
+
+Neighbours = List[Tuple[float, str]]
+
+
+class ContentIndex:
+    def __init__(self, n_features: int = N_FEATURES, n_neighbours: int = N_NEIGHBOURS):
+        self.n_features = n_features
+        self.n_neighbours = n_neighbours
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            stop_words="english",
+            alternate_sign=False,
+            norm=None,
+        )
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.counts: List[sp.csr_matrix] = []
+        self.rows: List[sp.csr_matrix] = []
+        self.neighbours: Dict[str, Neighbours] = {}
+        self._matrix = self._empty()
+
+    @classmethod
+    def build(cls, courses: Iterable[Tuple[str, str]], **kwargs) -> "ContentIndex":
+        """Index `(course_id, description)` pairs from scratch."""
+        index = cls(**kwargs)
+        courses = list(courses)
+        ids = [course_id for course_id, _ in courses]
+        # HashingVectorizer cannot transform an empty batch
+        counts = index.vectorizer.transform([text for _, text in courses]) if courses else index._empty()
+        index._load(ids, counts)
+        return index
+
+    def _empty(self) -> sp.csr_matrix:
+        return sp.csr_matrix((0, self.n_features))
+
+    def compacted(self) -> "ContentIndex":
+        """Return a new index equivalent to a full refit of the current catalog."""
+        index = type(self)(n_features=self.n_features, n_neighbours=self.n_neighbours)
+        counts = sp.vstack(self.counts, format="csr") if self.counts else self._empty()
+        index._load(list(self.ids), counts)
+        return index
+
+    def _load(self, ids: List[str], counts: sp.csr_matrix):
+        self.ids = ids
+        self.positions = {course_id: pos for pos, course_id in enumerate(ids)}
+        # Each csr row lists a term at most once, so counting indices gives df
+        self.doc_freq = np.bincount(counts.indices, minlength=self.n_features).astype(np.int64)
+        matrix = self._weigh(counts)
+        self.counts = [counts[pos] for pos in range(len(ids))]
+        self.rows = [matrix[pos] for pos in range(len(ids))]
+        self._matrix = matrix
+        self.neighbours = {}
+        for start in range(0, len(ids), SIMILARITY_BLOCK):
+            block = (matrix[start:start + SIMILARITY_BLOCK] @ matrix.T).toarray()
+            for offset, scores in enumerate(block):
+                pos = start + offset
+                self.neighbours[ids[pos]] = self._top_k(scores, pos)
+
+    def _idf(self) -> np.ndarray:
+        n_docs = len(self.ids)
+        return np.log((1 + n_docs) / (1 + self.doc_freq)) + 1
+
+    def _weigh(self, counts: sp.csr_matrix) -> sp.csr_matrix:
+        weighted = sp.csr_matrix(counts.multiply(self._idf()))
+        if weighted.shape[0] == 0:
+            # normalize() rejects matrices without rows
+            return weighted
+        return normalize(weighted, norm="l2", copy=False)
+
+    def _top_k(self, scores: np.ndarray, own_pos: int) -> Neighbours:
+        scores = scores.copy()
+        scores[own_pos] = 0
+        k = min(self.n_neighbours, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        return sorted(
+            ((float(scores[pos]), self.ids[pos]) for pos in top if scores[pos] > 0),
+            reverse=True,
+        )
+
+    @property
+    def matrix(self) -> sp.csr_matrix:
+        return self._matrix
+
+    def _set_row(self, pos: int, row: sp.csr_matrix):
+        """Splice one row into the stacked matrix instead of re-stacking every row."""
+        matrix = self._matrix
+        if pos == matrix.shape[0]:
+            self._matrix = sp.vstack([matrix, row], format="csr")
+        else:
+            self._matrix = sp.vstack([matrix[:pos], row, matrix[pos + 1:]], format="csr")
+
+    def _scores(self, row: sp.csr_matrix) -> np.ndarray:
+        return (self.matrix @ row.T).toarray().ravel()
+
+    def _set_neighbour(self, owner: str, course_id: str, score: float):
+        entries = [entry for entry in self.neighbours.get(owner, []) if entry[1] != course_id]
+        if score > 0 and (len(entries) < self.n_neighbours or score > entries[-1][0]):
+            entries.append((score, course_id))
+            entries.sort(reverse=True)
+            del entries[self.n_neighbours:]
+        self.neighbours[owner] = entries
+
+    def upsert(self, course_id: str, text: str):
+        """Add or re-index one course, touching only the lists it appears in."""
+        counts = self.vectorizer.transform([text])
+        touched = set()
+        if course_id in self.positions:
+            pos = self.positions[course_id]
+            # Courses similar to the old text may list it as a neighbour
+            touched.update(np.flatnonzero(self._scores(self.rows[pos])))
+            self.doc_freq[self.counts[pos].indices] -= 1
+            self.counts[pos] = counts
+        else:
+            pos = len(self.ids)
+            self.ids.append(course_id)
+            self.positions[course_id] = pos
+            self.counts.append(counts)
+            self.rows.append(None)
+        self.doc_freq[counts.indices] += 1
+
+        self.rows[pos] = self._weigh(counts)
+        self._set_row(pos, self.rows[pos])
+        scores = self._scores(self.rows[pos])
+        self.neighbours[course_id] = self._top_k(scores, pos)
+
+        touched.update(np.flatnonzero(scores))
+        touched.discard(pos)
+        for other in touched:
+            self._set_neighbour(self.ids[other], course_id, float(scores[other]))
+
+    def remove(self, course_id: str):
+        pos = self.positions.pop(course_id, None)
+        if pos is None:
+            return
+        for other in np.flatnonzero(self._scores(self.rows[pos])):
+            if other != pos:
+                self._set_neighbour(self.ids[other], course_id, 0.0)
+        self.doc_freq[self.counts[pos].indices] -= 1
+        self.neighbours.pop(course_id, None)
+
+        # Keep positions dense by moving the last course into the freed slot
+        last = len(self.ids) - 1
+        if pos != last:
+            moved = self.ids[last]
+            self.ids[pos] = moved
+            self.counts[pos] = self.counts[last]
+            self.rows[pos] = self.rows[last]
+            self.positions[moved] = pos
+            self._set_row(pos, self.rows[pos])
+        self.ids.pop()
+        self.counts.pop()
+        self.rows.pop()
+        self._matrix = self._matrix[:last]
+
+    def similar(self, course_id: str, limit: int) -> Neighbours:
+        return self.neighbours.get(course_id, [])[:limit]
+
+    def mean_similarity(self, course_ids: Iterable[str]) -> np.ndarray:
+        """Mean cosine similarity of every indexed course to `course_ids`."""
+        known = [self.positions[course_id] for course_id in course_ids if course_id in self.positions]
+        if not known:
+            return np.zeros(len(self.ids))
+        selected = sp.vstack([self.rows[pos] for pos in known], format="csr")
+        return np.asarray((self.matrix @ selected.T).mean(axis=1)).ravel()
+
+    def save(self, directory: str):
+        """Write the index for `SharedContentIndex`, padding neighbour lists with -1."""
+        positions = np.full((len(self.ids), self.n_neighbours), -1, dtype=np.int32)
+        scores = np.zeros((len(self.ids), self.n_neighbours), dtype=np.float32)
+        for pos, course_id in enumerate(self.ids):
+            for rank, (score, other) in enumerate(self.neighbours.get(course_id, [])):
+                positions[pos, rank] = self.positions[other]
+                scores[pos, rank] = score
+        save_ids(directory, "content_index", self.ids)
+        save_csr(directory, "content_index.tfidf", self.matrix)
+        save_array(directory, "content_index.neighbours", positions)
+        save_array(directory, "content_index.scores", scores)
+
+
+class SharedContentIndex:
+    """Read-only `ContentIndex` mapped from the files `ContentIndex.save` wrote.
+
+    It answers `similar` and `mean_similarity` like the in-memory index but
+    cannot be updated; publish a new build instead.
+    """
+
+    def __init__(self, directory: str):
+        self.positions = load_ids(directory, "content_index")
+        self.ids = self.positions.ids
+        self.matrix = load_csr(directory, "content_index.tfidf")
+        self.neighbour_positions = load_array(directory, "content_index.neighbours")
+        self.neighbour_scores = load_array(directory, "content_index.scores")
+
+    def similar(self, course_id: str, limit: int) -> Neighbours:
+        pos = self.positions.get(course_id)
+        if pos is None:
+            return []
+        neighbours = []
+        for other, score in zip(self.neighbour_positions[pos, :limit], self.neighbour_scores[pos, :limit]):
+            if other < 0:
+                break
+            neighbours.append((float(score), self.positions.id_at(other)))
+        return neighbours
+
+    def mean_similarity(self, course_ids: Iterable[str]) -> np.ndarray:
+        known = [self.positions[course_id] for course_id in course_ids if course_id in self.positions]
+        if not known:
+            return np.zeros(len(self.ids))
+        return np.asarray((self.matrix @ self.matrix[known].T).mean(axis=1)).ravel()
@@ -0,0 +1,160 @@
+"""Export CourseRecommender for inference and benchmark the result.
+
+`export` turns a train.py checkpoint (or the legacy weight file) into a
+TorchScript artifact. By default the embeddings and the linear layer are
+dynamically quantized to int8 first. The ID mappings travel inside the
+artifact, so the service can serve it with MODEL_FORMAT=torchscript:
+
+    python export.py export checkpoints/recommender-<version>.pt recommender.ts
+    python export.py benchmark checkpoints/recommender-<version>.pt recommender.ts
+
+`benchmark` loads each variant in a fresh interpreter to measure load time,
+RSS and scoring latency. It then compares the top-K courses each variant
+ranks for a sample of users.
+"""
+from typing import Dict, List
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import torch
+import torch.nn as nn
+from torch.ao.quantization import (
+    default_dynamic_qconfig,
+    float_qparams_weight_only_qconfig,
+    quantize_dynamic,
+)
+
+from model import load_recommender
+
+
+def export(checkpoint_path: str, output_path: str, quantize: bool = True):
+    loaded = load_recommender(checkpoint_path)
+    model = loaded.model
+    if quantize:
+        model = quantize_dynamic(model, {
+            nn.Linear: default_dynamic_qconfig,
+            nn.Embedding: float_qparams_weight_only_qconfig,
+        })
+    scripted = torch.jit.script(model)
+    mappings = {
+        "version": f"{loaded.version}-{'int8' if quantize else 'fp32'}",
+        "user_ids": list(loaded.user_index) if loaded.user_index is not None else None,
+        "course_ids": list(loaded.course_index) if loaded.course_index is not None else None,
+    }
+    torch.jit.save(scripted, output_path, _extra_files={"mappings.json": json.dumps(mappings)})
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def dimensions(loaded) -> Dict[str, int]:
+    users = len(loaded.user_index) if loaded.user_index is not None else 1000
+    courses = len(loaded.course_index) if loaded.course_index is not None else 1000
+    return {"users": users, "courses": courses}
+
+def score_all(loaded, user: int, courses: int) -> torch.Tensor:
+    with torch.inference_mode():
+        return loaded.model(
+            torch.full((courses,), user, dtype=torch.long),
+            torch.arange(courses),
+        ).view(-1)
+
+def measure(path: str, model_format: str, iterations: int, seed: int) -> Dict[str, float]:
+    """Runs inside a fresh interpreter so RSS reflects only this variant."""
+    baseline = rss_mb()
+    started = time.perf_counter()
+    loaded = load_recommender(path, model_format)
+    load_seconds = time.perf_counter() - started
+    loaded_rss = rss_mb()
+
+    dims = dimensions(loaded)
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    for _ in range(iterations):
+        user = rng.randrange(dims["users"])
+        started = time.perf_counter()
+        score_all(loaded, user, dims["courses"])
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "load_seconds": load_seconds,
+        "rss_mb": loaded_rss,
+        "model_rss_mb": loaded_rss - baseline,
+        "file_mb": os.path.getsize(path) / 2**20,
+        "score_all_courses_ms": {
+            "p50": latencies[len(latencies) // 2],
+            "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        },
+        "peak_rss_mb": rss_mb(),
+    }
+
+def measure_in_subprocess(path: str, model_format: str, iterations: int, seed: int) -> Dict[str, float]:
+    output = subprocess.check_output([
+        # The child runs from this directory, so relative paths must be resolved here
+        sys.executable, os.path.abspath(__file__), "measure", os.path.abspath(path),
+        "--format", model_format, "--iterations", str(iterations), "--seed", str(seed),
+    ], cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(output)
+
+def ranking_agreement(reference_path: str, exported_path: str, users: int, k: int, seed: int) -> Dict[str, float]:
+    reference = load_recommender(reference_path)
+    exported = load_recommender(exported_path, "torchscript")
+    dims = dimensions(reference)
+    rng = random.Random(seed)
+    overlaps = []
+    exact = 0
+    for _ in range(users):
+        user = rng.randrange(dims["users"])
+        expected = score_all(reference, user, dims["courses"]).topk(k).indices.tolist()
+        actual = score_all(exported, user, dims["courses"]).topk(k).indices.tolist()
+        overlaps.append(len(set(expected) & set(actual)) / k)
+        exact += expected == actual
+    return {
+        f"top{k}_overlap": sum(overlaps) / len(overlaps),
+        f"top{k}_identical_order": exact / users,
+        "users": users,
+    }
+
+def benchmark(checkpoint_path: str, exported_path: str, iterations: int, users: int, k: int, seed: int) -> dict:
+    return {
+        "eager_fp32": measure_in_subprocess(checkpoint_path, "eager", iterations, seed),
+        "exported": measure_in_subprocess(exported_path, "torchscript", iterations, seed),
+        "ranking_agreement": ranking_agreement(checkpoint_path, exported_path, users, k, seed),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export and benchmark CourseRecommender")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export")
+    export_parser.add_argument("checkpoint")
+    export_parser.add_argument("output")
+    export_parser.add_argument("--no-quantize", action="store_true", help="Keep float32 weights")
+
+    bench_parser = commands.add_parser("benchmark")
+    bench_parser.add_argument("checkpoint")
+    bench_parser.add_argument("exported")
+    bench_parser.add_argument("--iterations", type=int, default=200)
+    bench_parser.add_argument("--users", type=int, default=200)
+    bench_parser.add_argument("--k", type=int, default=10)
+    bench_parser.add_argument("--seed", type=int, default=42)
+
+    measure_parser = commands.add_parser("measure")
+    measure_parser.add_argument("path")
+    measure_parser.add_argument("--format", choices=["eager", "torchscript"], default="eager")
+    measure_parser.add_argument("--iterations", type=int, default=200)
+    measure_parser.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args.checkpoint, args.output, quantize=not args.no_quantize)
+    elif args.command == "benchmark":
+        print(json.dumps(benchmark(args.checkpoint, args.exported, args.iterations, args.users, args.k, args.seed), indent=2))
+    else:
+        print(json.dumps(measure(args.path, args.format, args.iterations, args.seed)))
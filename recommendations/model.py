@@ -0,0 +1,148 @@
+import torch
+import torch.nn as nn
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+
+# Dimensions of the original placeholder weights, which carry no ID mappings
+LEGACY_USERS = 1000
+LEGACY_COURSES = 1000
+
+# Neural Network for Collaborative Filtering
+class CourseRecommender(nn.Module):
+    def __init__(self, n_users, n_courses, n_factors=100):
+        super().__init__()
+        self.user_factors = nn.Embedding(n_users, n_factors)
+        self.course_factors = nn.Embedding(n_courses, n_factors)
+        self.dropout = nn.Dropout(0.1)
+        self.fc = nn.Linear(n_factors * 2, 1)
+
+    def forward(self, user_ids, course_ids):
+        user_embeds = self.user_factors(user_ids)
+        course_embeds = self.course_factors(course_ids)
+        x = torch.cat([user_embeds, course_embeds], dim=1)
+        x = self.dropout(x)
+        return self.fc(x).squeeze()
+
+
+class LoadedRecommender:
+    """A recommender plus the ID mappings it was trained with.
+
+    Checkpoints written by `train.py` map student and course IDs to embedding
+    rows. Legacy weight files have no mappings, so they fall back to the old
+    behaviour: the numeric user ID and the course's position in the catalog.
+    """
+
+    def __init__(self, model: nn.Module, user_ids: Optional[List[str]] = None, course_ids: Optional[List[str]] = None, version: str = "legacy"):
+        self.model = model
+        self.version = version
+        self.user_index: Optional[Dict[str, int]] = (
+            {user_id: pos for pos, user_id in enumerate(user_ids)} if user_ids is not None else None
+        )
+        self.course_index: Optional[Dict[str, int]] = (
+            {course_id: pos for pos, course_id in enumerate(course_ids)} if course_ids is not None else None
+        )
+
+    def user_position(self, user_id: str) -> Optional[int]:
+        if self.user_index is None:
+            return int(user_id)
+        return self.user_index.get(user_id)
+
+    def course_position(self, course_id: str, catalog_position: int) -> Optional[int]:
+        if self.course_index is None:
+            return catalog_position
+        return self.course_index.get(course_id)
+
+    def score_courses(self, user_id: str, courses: Sequence[Tuple[str, int]]) -> List[float]:
+        """Score `(course_id, catalog_position)` pairs for one user in a single forward pass.
+
+        Users or courses the model never saw score 0.
+        """
+        scores = [0.0] * len(courses)
+        user = self.user_position(user_id)
+        if user is None:
+            return scores
+        known = []
+        for pos, (course_id, catalog_position) in enumerate(courses):
+            course = self.course_position(course_id, catalog_position)
+            if course is not None:
+                known.append((pos, course))
+        if not known:
+            return scores
+        with torch.inference_mode():
+            output = self.model(
+                torch.full((len(known),), user, dtype=torch.long),
+                torch.tensor([course for _, course in known], dtype=torch.long),
+            ).view(-1).tolist()
+        for (pos, _), score in zip(known, output):
+            scores[pos] = score
+        return scores
+
+
+def save_checkpoint(path: str, model: CourseRecommender, n_factors: int, user_ids: List[str], course_ids: List[str], version: str, metrics: Optional[dict] = None):
+    torch.save({
+        "version": version,
+        "n_factors": n_factors,
+        "state_dict": model.state_dict(),
+        "user_ids": user_ids,
+        "course_ids": course_ids,
+        "metrics": metrics or {},
+    }, path)
+
+def load_recommender(path: str, model_format: str = "eager") -> LoadedRecommender:
+    """Load a checkpoint (`eager`) or an `export.py` artifact (`torchscript`)."""
+    if model_format == "torchscript":
+        extra_files = {"mappings.json": ""}
+        scripted = torch.jit.load(path, map_location="cpu", _extra_files=extra_files)
+        mappings = json.loads(extra_files["mappings.json"])
+        return LoadedRecommender(scripted, mappings["user_ids"], mappings["course_ids"], mappings["version"])
+
+    checkpoint = torch.load(path, map_location="cpu")
+    if "state_dict" not in checkpoint:
+        model = CourseRecommender(LEGACY_USERS, LEGACY_COURSES)  # Placeholder dimensions
+        model.load_state_dict(checkpoint)
+        model.eval()
+        return LoadedRecommender(model)
+
+    user_ids = checkpoint["user_ids"]
+    course_ids = checkpoint["course_ids"]
+    model = CourseRecommender(len(user_ids), len(course_ids), checkpoint["n_factors"])
+    model.load_state_dict(checkpoint["state_dict"])
+    model.eval()
+    return LoadedRecommender(model, user_ids, course_ids, checkpoint["version"])
+
+def save_shared(loaded: LoadedRecommender, directory: str):
+    """Write an eager model's weights and ID mappings as `.npy` arrays for `load_shared`."""
+    # Imported here so train.py and export.py keep running without common/ on the path
+    from common.artifacts import save_array, save_ids, save_json
+    if isinstance(loaded.model, torch.jit.ScriptModule):
+        raise ValueError("TorchScript artifacts cannot be shared, load them per worker")
+    for name, tensor in loaded.model.state_dict().items():
+        save_array(directory, f"model.{name}", tensor.detach().cpu().numpy())
+    save_json(directory, "model", {
+        "version": loaded.version,
+        "n_users": loaded.model.user_factors.num_embeddings,
+        "n_courses": loaded.model.course_factors.num_embeddings,
+        "n_factors": loaded.model.user_factors.embedding_dim,
+        "mapped": loaded.user_index is not None,
+    })
+    if loaded.user_index is not None:
+        save_ids(directory, "model.users", list(loaded.user_index))
+        save_ids(directory, "model.courses", list(loaded.course_index))
+
+def load_shared(directory: str) -> LoadedRecommender:
+    """Attach to weights written by `save_shared` without copying them."""
+    from common.artifacts import load_array, load_ids, load_json
+    meta = load_json(directory, "model")
+    # Meta tensors allocate nothing; every parameter is replaced by a mapped array
+    with torch.device("meta"):
+        model = CourseRecommender(meta["n_users"], meta["n_courses"], meta["n_factors"])
+    for name, _ in list(model.named_parameters()):
+        module_name, _, attr = name.rpartition(".")
+        weights = torch.from_numpy(load_array(directory, f"model.{name}", writable=True))
+        setattr(model.get_submodule(module_name), attr, nn.Parameter(weights, requires_grad=False))
+    model.eval()
+    loaded = LoadedRecommender(model, version=meta["version"])
+    if meta["mapped"]:
+        loaded.user_index = load_ids(directory, "model.users")
+        loaded.course_index = load_ids(directory, "model.courses")
+    return loaded
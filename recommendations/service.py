@@ -1,51 +1,108 @@
 from fastapi import FastAPI, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import torch
-import torch.nn as nn
-from typing import List, Dict
+from contextlib import asynccontextmanager
+import asyncio
+from typing import Optional
 import os
 from dotenv import load_dotenv
+from common.artifacts import current_artifacts
+from common.database import mongo_lifespan, get_database, get_collection, connect_to_mongo, close_mongo_connection
+from common.metrics import instrument, timed
+from common.admission import Limit, admission_control, to_http_exception
+from content_index import ContentIndex, SharedContentIndex
+from model import LoadedRecommender, load_recommender, load_shared, save_shared
 
 # Load environment variables
 load_dotenv()
 
+COMPACTION_INTERVAL = int(os.getenv("CONTENT_INDEX_COMPACTION_SECONDS", "3600"))
+
+# Initialize the model: a train.py checkpoint or the legacy placeholder weights
+MODEL_WEIGHTS_PATH = os.getenv("MODEL_WEIGHTS_PATH", "recommendations/model_weights.pth")
+# "torchscript" serves an export.py artifact (optionally int8 quantized) instead
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "eager")
+# Loaded by the lifespan, from the shared artifacts when gunicorn.conf.py published them
+recommender: Optional[LoadedRecommender] = None
+
+# Content-based index, built at startup and updated per course afterwards
+content_index = ContentIndex()
+index_lock = asyncio.Lock()
+
+async def load_content_index() -> ContentIndex:
+    courses = await get_collection("courses").find({}, {"description": 1}).to_list(length=None)
+    pairs = [(course["_id"], course.get("description", "")) for course in courses]
+    with timed("tfidf_fit"):
+        return await asyncio.to_thread(ContentIndex.build, pairs)
+
+async def rebuild_content_index():
+    global content_index
+    content_index = await load_content_index()
+
+async def build_artifacts(directory: str):
+    """Build the index and model once in the gunicorn master (see gunicorn.conf.py)."""
+    await connect_to_mongo("recommendations", "phn_platform")
+    try:
+        index = await load_content_index()
+    finally:
+        # The master forks workers next, so it must not keep a client open
+        await close_mongo_connection()
+    index.save(directory)
+    if MODEL_FORMAT == "eager":
+        save_shared(load_recommender(MODEL_WEIGHTS_PATH, MODEL_FORMAT), directory)
+
+def index_is_shared() -> bool:
+    return isinstance(content_index, SharedContentIndex)
+
+async def compact_content_index():
+    global content_index
+    # Writers wait for the compaction; readers keep using the old index until the swap
+    async with index_lock:
+        with timed("content_index_compaction"):
+            content_index = await asyncio.to_thread(content_index.compacted)
+
+async def compact_periodically():
+    while True:
+        await asyncio.sleep(COMPACTION_INTERVAL)
+        await compact_content_index()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global content_index, recommender
+    async with mongo_lifespan("recommendations", "phn_platform")(app):
+        artifacts = current_artifacts("recommendations")
+        if artifacts is not None:
+            # Map what the master built; the shared index is read-only, so no compaction
+            content_index = SharedContentIndex(artifacts)
+            if MODEL_FORMAT == "eager":
+                recommender = load_shared(artifacts)
+            else:
+                recommender = load_recommender(MODEL_WEIGHTS_PATH, MODEL_FORMAT)
+            yield
+            return
+        recommender = load_recommender(MODEL_WEIGHTS_PATH, MODEL_FORMAT)
+        await rebuild_content_index()
+        compaction = asyncio.create_task(compact_periodically())
+        try:
+            yield
+        finally:
+            compaction.cancel()
+
 app = FastAPI(
     title="Course Recommendations Service",
     description="AI-powered course recommendations using collaborative filtering and deep learning",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+admission_control(app, {
+    "/api/recommendations/{user_id}": Limit(concurrency=16, queue=64, timeout_ms=10000),
+    "/api/content-index/compact": Limit(concurrency=1, queue=0),
+}, default=Limit(concurrency=64, queue=256, timeout_ms=10000))
+instrument(app)
 
-# MongoDB connection
-MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGODB_URL)
-db = client.phn_platform
-
-# Neural Network for Collaborative Filtering
-class CourseRecommender(nn.Module):
-    def __init__(self, n_users, n_courses, n_factors=100):
-        super().__init__()
-        self.user_factors = nn.Embedding(n_users, n_factors)
-        self.course_factors = nn.Embedding(n_courses, n_factors)
-        self.dropout = nn.Dropout(0.1)
-        self.fc = nn.Linear(n_factors * 2, 1)
-        
-    def forward(self, user_ids, course_ids):
-        user_embeds = self.user_factors(user_ids)
-        course_embeds = self.course_factors(course_ids)
-        x = torch.cat([user_embeds, course_embeds], dim=1)
-        x = self.dropout(x)
-        return self.fc(x).squeeze()
-
-# Initialize the model
-model = CourseRecommender(1000, 1000)  # Placeholder dimensions
-model.load_state_dict(torch.load('recommendations/model_weights.pth'))
-model.eval()
-
-# TF-IDF Vectorizer for content-based filtering
-vectorizer = TfidfVectorizer(stop_words='english')
+def read_only_index():
+    return HTTPException(
+        status_code=409,
+        detail="The content index is shared between workers; send SIGHUP to the gunicorn master to rebuild it"
+    )
 
 @app.get("/health")
 async def health_check():
@@ -54,6 +111,7 @@ async def health_check():
 @app.get("/api/recommendations/{user_id}")
 async def get_recommendations(user_id: str, limit: int = 10):
     try:
+        db = get_database()
         # Get user's course history
         user_progress = await db.student_progress.find(
             {"student_id": user_id}
@@ -69,34 +127,29 @@ async def get_recommendations(user_id: str, limit: int = 10):
         # Get all courses
         all_courses = await db.courses.find().to_list(length=None)
         
-        # Prepare course descriptions for content-based filtering
-        course_descriptions = [course["description"] for course in all_courses]
-        tfidf_matrix = vectorizer.fit_transform(course_descriptions)
-        
-        # Calculate cosine similarity
-        cosine_sim = cosine_similarity(tfidf_matrix)
-        
         # Get user's completed courses
         completed_courses = [progress["course_id"] for progress in user_progress]
         
-        # Get course indices
-        course_indices = {course["_id"]: idx for idx, course in enumerate(all_courses)}
+        # Mean similarity of every indexed course to the completed ones
+        with timed("content_scores"):
+            content_scores = content_index.mean_similarity(completed_courses)
+        index_positions = content_index.positions
         
         # Calculate recommendation scores
+        candidates = [
+            (idx, course) for idx, course in enumerate(all_courses)
+            if course["_id"] not in completed_courses
+        ]
         scores = []
-        for idx, course in enumerate(all_courses):
-            if course["_id"] not in completed_courses:
+        with timed("model_scoring"):
+            # Collaborative filtering scores for every candidate in one batch
+            collab_scores = recommender.score_courses(
+                user_id, [(course["_id"], idx) for idx, course in candidates]
+            )
+            for (idx, course), collab_score in zip(candidates, collab_scores):
                 # Content-based score
-                content_score = np.mean([
-                    cosine_sim[course_indices[course["_id"]]][course_indices[comp_course]]
-                    for comp_course in completed_courses
-                ]) if completed_courses else 0
-                
-                # Collaborative filtering score
-                collab_score = model(
-                    torch.tensor([int(user_id)]),
-                    torch.tensor([idx])
-                ).item()
+                position = index_positions.get(course["_id"])
+                content_score = float(content_scores[position]) if position is not None else 0
                 
                 # Combined score
                 combined_score = 0.7 * content_score + 0.3 * collab_score
@@ -110,47 +163,68 @@ async def get_recommendations(user_id: str, limit: int = 10):
         return {"recommendations": recommendations}
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise to_http_exception(e)
 
 @app.get("/api/similar-courses/{course_id}")
 async def get_similar_courses(course_id: str, limit: int = 5):
     try:
-        # Get all courses
-        all_courses = await db.courses.find().to_list(length=None)
-        
-        # Get target course
-        target_course = next(
-            (course for course in all_courses if course["_id"] == course_id),
-            None
-        )
-        
-        if not target_course:
-            raise HTTPException(status_code=404, detail="Course not found")
-        
-        # Prepare course descriptions
-        course_descriptions = [course["description"] for course in all_courses]
-        tfidf_matrix = vectorizer.fit_transform(course_descriptions)
-        
-        # Calculate cosine similarity
-        cosine_sim = cosine_similarity(tfidf_matrix)
-        
-        # Get course index
-        course_indices = {course["_id"]: idx for idx, course in enumerate(all_courses)}
-        target_idx = course_indices[course_id]
-        
-        # Get similar courses
-        similar_scores = list(enumerate(cosine_sim[target_idx]))
-        similar_scores = sorted(similar_scores, key=lambda x: x[1], reverse=True)
-        similar_scores = similar_scores[1:limit+1]
-        
+        db = get_database()
+        if course_id not in content_index.positions:
+            # Courses written without a reindex call are picked up on first use
+            target_course = await db.courses.find_one({"_id": course_id}, {"description": 1})
+            if not target_course:
+                raise HTTPException(status_code=404, detail="Course not found")
+            if index_is_shared():
+                # Not in the published build yet
+                return {"similar_courses": []}
+            async with index_lock:
+                content_index.upsert(course_id, target_course.get("description", ""))
+        
+        # Neighbour lists are precomputed, so only the result courses are fetched
+        similar_ids = [similar_id for _, similar_id in content_index.similar(course_id, limit)]
+        courses = await db.courses.find({"_id": {"$in": similar_ids}}).to_list(length=None)
+        courses_by_id = {course["_id"]: course for course in courses}
         similar_courses = [
-            all_courses[idx] for idx, _ in similar_scores
+            courses_by_id[similar_id] for similar_id in similar_ids if similar_id in courses_by_id
         ]
         
         return {"similar_courses": similar_courses}
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise to_http_exception(e)
+
+# Call after a course is created or its description changes
+@app.put("/api/content-index/{course_id}")
+async def reindex_course(course_id: str):
+    if index_is_shared():
+        raise read_only_index()
+    course = await get_collection("courses").find_one({"_id": course_id}, {"description": 1})
+    async with index_lock:
+        if course is None:
+            content_index.remove(course_id)
+            return {"course_id": course_id, "indexed": False}
+        with timed("content_index_upsert"):
+            content_index.upsert(course_id, course.get("description", ""))
+    return {"course_id": course_id, "indexed": True}
+
+@app.delete("/api/content-index/{course_id}")
+async def remove_course_from_index(course_id: str):
+    if index_is_shared():
+        raise read_only_index()
+    async with index_lock:
+        content_index.remove(course_id)
+    return {"course_id": course_id, "indexed": False}
+
+@app.post("/api/content-index/compact")
+async def compact_index(reload: bool = False):
+    if index_is_shared():
+        raise read_only_index()
+    if reload:
+        async with index_lock:
+            await rebuild_content_index()
+    else:
+        await compact_content_index()
+    return {"courses": len(content_index.ids)}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Tests import service modules the way the service does: common/ from the
+# repository root and content_index/model as top-level modules
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, os.path.dirname(SERVICE_DIR))
+sys.path.insert(0, SERVICE_DIR)
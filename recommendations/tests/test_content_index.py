@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from content_index import ContentIndex
+
+COURSES = [
+    ("python", "python programming loops functions variables"),
+    ("data", "python data analysis pandas statistics"),
+    ("stats", "statistics probability data distributions"),
+    ("art", "painting drawing colour composition"),
+    ("music", "music theory harmony composition"),
+]
+
+
+def assert_equivalent(index: ContentIndex, expected: ContentIndex):
+    assert sorted(index.ids) == sorted(expected.ids)
+    assert index.matrix.shape == (len(index.ids), index.n_features)
+    for course_id in expected.ids:
+        actual = index.matrix[index.positions[course_id]].toarray()
+        np.testing.assert_allclose(actual, expected.matrix[expected.positions[course_id]].toarray())
+        assert [c for _, c in index.similar(course_id, 10)] == [c for _, c in expected.similar(course_id, 10)]
+
+
+def test_build_empty_catalog():
+    index = ContentIndex.build([])
+    assert index.ids == []
+    assert index.matrix.shape == (0, index.n_features)
+    assert index.similar("python", 5) == []
+    assert index.mean_similarity(["python"]).shape == (0,)
+
+
+def test_upsert_into_empty_index():
+    index = ContentIndex.build([])
+    for course_id, text in COURSES:
+        index.upsert(course_id, text)
+    assert_equivalent(index.compacted(), ContentIndex.build(COURSES))
+    assert index.similar("python", 1)[0][1] == "data"
+
+
+def test_upsert_existing_course_updates_neighbours():
+    index = ContentIndex.build(COURSES)
+    index.upsert("art", "python programming functions")
+    assert "art" in [c for _, c in index.similar("python", 5)]
+    assert_equivalent(index.compacted(), ContentIndex.build(COURSES[:3] + [("art", "python programming functions")] + COURSES[4:]))
+
+
+def test_remove_keeps_matrix_and_positions_consistent():
+    index = ContentIndex.build(COURSES)
+    index.remove("data")
+    assert "data" not in index.positions
+    assert index.matrix.shape[0] == len(index.ids) == 4
+    for course_id in index.ids:
+        assert "data" not in [c for _, c in index.similar(course_id, 10)]
+    remaining = [course for course in COURSES if course[0] != "data"]
+    assert_equivalent(index.compacted(), ContentIndex.build(remaining))
+
+
+def test_remove_last_course_leaves_empty_index():
+    index = ContentIndex.build(COURSES[:1])
+    index.remove("python")
+    assert index.ids == []
+    assert index.matrix.shape == (0, index.n_features)
+    compacted = index.compacted()
+    assert compacted.ids == []
+    assert compacted.matrix.shape == (0, index.n_features)
+
+
+def test_compacted_matches_fresh_build():
+    index = ContentIndex.build(COURSES[:2])
+    for course_id, text in COURSES[2:]:
+        index.upsert(course_id, text)
+    compacted = index.compacted()
+    assert_equivalent(compacted, ContentIndex.build(COURSES))
+    np.testing.assert_allclose(
+        compacted.mean_similarity(["python"]),
+        ContentIndex.build(COURSES).mean_similarity(["python"]),
+    )
+
+
+def test_remove_unknown_course_is_noop():
+    index = ContentIndex.build(COURSES)
+    index.remove("missing")
+    assert len(index.ids) == len(COURSES)
+
+
+@pytest.mark.parametrize("courses", [[], COURSES])
+def test_mean_similarity_ignores_unknown_courses(courses):
+    index = ContentIndex.build(courses)
+    assert np.all(index.mean_similarity(["missing"]) == 0)
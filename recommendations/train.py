@@ -0,0 +1,269 @@
+"""Train CourseRecommender from the student_progress collection.
+
+Interactions are streamed out of MongoDB by DataLoader workers, each reading
+its own `_id` range, so memory stays bounded by the shuffle buffer rather than
+the collection size. Every enrolment is a positive weighted by its progress,
+and each positive is mixed with uniformly sampled negative courses in the
+same batches. A deterministic hash holds out a slice of interactions for
+offline HitRate@K / NDCG@K against sampled negatives.
+
+    python train.py --epochs 3 --workers 4 --output-dir checkpoints
+
+The checkpoint stores the weights together with the student and course ID
+mappings; point MODEL_WEIGHTS_PATH at it to serve it.
+"""
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+from pymongo import MongoClient
+from datetime import datetime
+from dotenv import load_dotenv
+from typing import Dict, Iterator, List, Tuple
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import time
+import torch
+import torch.nn as nn
+
+from model import CourseRecommender, save_checkpoint
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+MONGODB_DB = os.getenv("MONGODB_DB", "phn_platform")
+
+PROGRESS_FIELDS = {"student_id": 1, "course_id": 1, "overall_progress": 1, "_id": 0}
+
+
+def is_validation(student_id: str, course_id: str, fraction: float) -> bool:
+    digest = hashlib.blake2b(f"{student_id}|{course_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % 10_000 < fraction * 10_000
+
+
+def load_id_mappings(db) -> Tuple[List[str], List[str]]:
+    course_ids = [doc["_id"] for doc in db.courses.find({}, {"_id": 1}).sort("_id", 1)]
+    user_ids = [
+        doc["_id"]
+        for doc in db.student_progress.aggregate(
+            [{"$group": {"_id": "$student_id"}}, {"$sort": {"_id": 1}}],
+            allowDiskUse=True,
+        )
+    ]
+    return user_ids, course_ids
+
+def shard_filters(db, shards: int) -> List[dict]:
+    """Split student_progress into contiguous `_id` ranges of similar size."""
+    if shards <= 1:
+        return [{}]
+    buckets = list(db.student_progress.aggregate(
+        [{"$bucketAuto": {"groupBy": "$_id", "buckets": shards}}],
+        allowDiskUse=True,
+    ))
+    filters = []
+    for pos, bucket in enumerate(buckets):
+        # Bucket bounds are half-open except for the last one
+        upper = "$lte" if pos == len(buckets) - 1 else "$lt"
+        filters.append({"_id": {"$gte": bucket["_id"]["min"], upper: bucket["_id"]["max"]}})
+    return filters or [{}]
+
+
+class InteractionStream(IterableDataset):
+    """Yields `(user, course, label, weight)` rows with sampled negatives mixed in."""
+
+    def __init__(self, shards: List[dict], user_index: Dict[str, int], course_index: Dict[str, int], negatives: int, shuffle_buffer: int, validation_fraction: float, seed: int):
+        self.shards = shards
+        self.user_index = user_index
+        self.course_index = course_index
+        self.negatives = negatives
+        self.shuffle_buffer = shuffle_buffer
+        self.validation_fraction = validation_fraction
+        self.seed = seed
+        self.epoch = 0
+
+    def __iter__(self) -> Iterator[Tuple[int, int, float, float]]:
+        info = get_worker_info()
+        worker_id, num_workers = (0, 1) if info is None else (info.id, info.num_workers)
+        rng = random.Random(self.seed * 1_000_003 + self.epoch * 1_009 + worker_id)
+        n_courses = len(self.course_index)
+        buffer: List[Tuple[int, int, float, float]] = []
+
+        # Each worker opens its own client after the fork
+        client = MongoClient(MONGODB_URL, appname="recommendations-train")
+        try:
+            progress = client[MONGODB_DB].student_progress
+            for shard in self.shards[worker_id::num_workers]:
+                for doc in progress.find(shard, PROGRESS_FIELDS).batch_size(5000):
+                    user = self.user_index.get(doc["student_id"])
+                    course = self.course_index.get(doc["course_id"])
+                    if user is None or course is None:
+                        continue
+                    if is_validation(doc["student_id"], doc["course_id"], self.validation_fraction):
+                        continue
+                    # Completed courses count more than ones barely started
+                    buffer.append((user, course, 1.0, 0.5 + 0.5 * float(doc.get("overall_progress", 0))))
+                    for _ in range(self.negatives):
+                        buffer.append((user, rng.randrange(n_courses), 0.0, 1.0))
+                    while len(buffer) >= self.shuffle_buffer:
+                        pos = rng.randrange(len(buffer))
+                        buffer[pos], buffer[-1] = buffer[-1], buffer[pos]
+                        yield buffer.pop()
+        finally:
+            client.close()
+        rng.shuffle(buffer)
+        yield from buffer
+
+
+def collect_validation(db, user_index: Dict[str, int], course_index: Dict[str, int], fraction: float, limit: int, rng: random.Random) -> List[Tuple[int, int]]:
+    """Reservoir-sample up to `limit` held-out positives."""
+    sample: List[Tuple[int, int]] = []
+    seen = 0
+    for doc in db.student_progress.find({}, PROGRESS_FIELDS).batch_size(5000):
+        if not is_validation(doc["student_id"], doc["course_id"], fraction):
+            continue
+        user = user_index.get(doc["student_id"])
+        course = course_index.get(doc["course_id"])
+        if user is None or course is None:
+            continue
+        seen += 1
+        if len(sample) < limit:
+            sample.append((user, course))
+        else:
+            pos = rng.randrange(seen)
+            if pos < limit:
+                sample[pos] = (user, course)
+    return sample
+
+def evaluate(model: CourseRecommender, samples: List[Tuple[int, int]], n_courses: int, k: int, negatives: int, rng: random.Random, batch_size: int = 256) -> Dict[str, float]:
+    """HitRate@k and NDCG@k of each held-out course against sampled negatives."""
+    if not samples:
+        return {f"hit_rate@{k}": 0.0, f"ndcg@{k}": 0.0, "eval_samples": 0}
+    model.eval()
+    hits = 0.0
+    ndcg = 0.0
+    candidates_per_sample = negatives + 1
+    with torch.no_grad():
+        for start in range(0, len(samples), batch_size):
+            batch = samples[start:start + batch_size]
+            users = torch.tensor([user for user, _ in batch]).repeat_interleave(candidates_per_sample)
+            courses = torch.tensor([
+                [course] + [rng.randrange(n_courses) for _ in range(negatives)]
+                for _, course in batch
+            ]).view(-1)
+            scores = model(users, courses).view(len(batch), candidates_per_sample)
+            # Rank of the held-out course among its candidates (0 = best)
+            ranks = (scores[:, 1:] > scores[:, :1]).sum(dim=1)
+            for rank in ranks.tolist():
+                if rank < k:
+                    hits += 1
+                    ndcg += 1 / math.log2(rank + 2)
+    return {
+        f"hit_rate@{k}": hits / len(samples),
+        f"ndcg@{k}": ndcg / len(samples),
+        "eval_samples": len(samples),
+    }
+
+
+def train(args) -> dict:
+    torch.manual_seed(args.seed)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    rng = random.Random(args.seed)
+
+    client = MongoClient(MONGODB_URL, appname="recommendations-train")
+    db = client[MONGODB_DB]
+    user_ids, course_ids = load_id_mappings(db)
+    if not user_ids or not course_ids:
+        raise SystemExit("No student_progress or courses to train on")
+    user_index = {user_id: pos for pos, user_id in enumerate(user_ids)}
+    course_index = {course_id: pos for pos, course_id in enumerate(course_ids)}
+
+    dataset = InteractionStream(
+        shard_filters(db, max(1, args.workers) * args.shards_per_worker),
+        user_index,
+        course_index,
+        negatives=args.negatives,
+        shuffle_buffer=args.shuffle_buffer,
+        validation_fraction=args.validation_fraction,
+        seed=args.seed,
+    )
+    model = CourseRecommender(len(user_ids), len(course_ids), args.factors)
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
+    loss_fn = nn.BCEWithLogitsLoss(reduction="none")
+
+    epochs = []
+    for epoch in range(args.epochs):
+        # Workers copy the dataset when the loader starts, so set the epoch first
+        dataset.epoch = epoch
+        loader = DataLoader(
+            dataset,
+            batch_size=args.batch_size,
+            num_workers=args.workers,
+            prefetch_factor=4 if args.workers else None,
+        )
+        model.train()
+        samples = 0
+        total_loss = 0.0
+        started = time.perf_counter()
+        for users, courses, labels, weights in loader:
+            optimizer.zero_grad()
+            logits = model(users, courses).view(-1)
+            loss = (loss_fn(logits, labels.float()) * weights.float()).mean()
+            loss.backward()
+            optimizer.step()
+            samples += len(labels)
+            total_loss += loss.item() * len(labels)
+        elapsed = time.perf_counter() - started
+        stats = {
+            "epoch": epoch,
+            "samples": samples,
+            "loss": total_loss / samples if samples else 0.0,
+            "samples_per_sec": samples / elapsed if elapsed else 0.0,
+            "seconds": elapsed,
+        }
+        epochs.append(stats)
+        print(json.dumps(stats))
+
+    validation = collect_validation(db, user_index, course_index, args.validation_fraction, args.eval_samples, rng)
+    client.close()
+    metrics = evaluate(model, validation, len(course_ids), args.k, args.eval_negatives, rng)
+
+    version = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    os.makedirs(args.output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(args.output_dir, f"recommender-{version}.pt")
+    report = {
+        "version": version,
+        "checkpoint": checkpoint_path,
+        "users": len(user_ids),
+        "courses": len(course_ids),
+        "params": {key: value for key, value in vars(args).items() if key != "output_dir"},
+        "epochs": epochs,
+        "metrics": metrics,
+    }
+    save_checkpoint(checkpoint_path, model, args.factors, user_ids, course_ids, version, report)
+    with open(os.path.join(args.output_dir, f"recommender-{version}.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train CourseRecommender from student_progress")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--factors", type=int, default=100)
+    parser.add_argument("--negatives", type=int, default=4, help="Negative courses sampled per positive")
+    parser.add_argument("--workers", type=int, default=2, help="DataLoader worker processes")
+    parser.add_argument("--shards-per-worker", type=int, default=4)
+    parser.add_argument("--shuffle-buffer", type=int, default=50000)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 keeps the default)")
+    parser.add_argument("--validation-fraction", type=float, default=0.05)
+    parser.add_argument("--eval-samples", type=int, default=10000)
+    parser.add_argument("--eval-negatives", type=int, default=99)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output-dir", default="checkpoints")
+    args = parser.parse_args()
+
+    print(json.dumps(train(args), indent=2))
@@ -8,6 +8,8 @@ Start-Process redis-server -NoNewWindow
 
 # Start backend services
 Write-Host "Starting backend services..."
+# Services import the shared data-access package from common/
+$env:PYTHONPATH = "$PWD;$env:PYTHONPATH"
 Start-Process python -ArgumentList "-m uvicorn main:app --reload --port 8000" -WorkingDirectory "./backend" -NoNewWindow
 Start-Process python -ArgumentList "-m uvicorn service:app --reload --port 8001" -WorkingDirectory "./recommendations" -NoNewWindow
 Start-Process python -ArgumentList "-m uvicorn service:app --reload --port 8002" -WorkingDirectory "./chatbot" -NoNewWindow
@@ -10,6 +10,8 @@ redis-server &
 
 # Start backend services
 echo "Starting backend services..."
+# Services import the shared data-access package from common/
+export PYTHONPATH="$(pwd):$PYTHONPATH"
 cd backend && python -m uvicorn main:app --reload --port 8000 &
 cd ../recommendations && python -m uvicorn service:app --reload --port 8001 &
 cd ../chatbot && python -m uvicorn service:app --reload --port 8002 &